@@ -215,13 +215,14 @@ class Cave:
         return f"{self.name} {self.material} {self.quantity}"
 
     @classmethod
-    def random_cave(self, material_list: list[Material]) -> Cave:
+    def random_cave(self, material_list: list[Material], rng: RandomGen | None = None) -> Cave:
         """
         
         The Class Method that is returns a random Cave Class Object
 
         Parameters:
             material_list (list[Material]): A list of material objects from which a random material is chosen from to be mined from the cave
+            rng (RandomGen | None): The random stream to draw from, defaults to the RandomGen class stream
         
         Returns:
             A Cave Object that is randomly made
@@ -236,12 +237,13 @@ class Cave:
             O(1)
         """
         
+        rng = RandomGen if rng is None else rng
         # Getting the needed values to pass through to initialise a Cave Object
         number_materials = len(material_list)
-        random_material_index = RandomGen.randint(0,number_materials-1)
-        random_material_quantity = RandomGen.randint(1,10)
+        random_material_index = rng.randint(0,number_materials-1)
+        random_material_quantity = rng.randint(1,10)
         # Returning a Cave Object
-        return Cave(CAVE_NAMES[RandomGen.randint(0,len(CAVE_NAMES)-1)],material_list[random_material_index],random_material_quantity)
+        return Cave(CAVE_NAMES[rng.randint(0,len(CAVE_NAMES)-1)],material_list[random_material_index],random_material_quantity)
 
 if __name__ == "__main__":
     print(Cave("Mt Coronet", Material("Coal", 4.5), 3))
@@ -0,0 +1,108 @@
+""" Fenwick Tree
+
+Defines a Fenwick (binary indexed) tree over floats, supporting point updates and prefix sums.
+"""
+from __future__ import annotations
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+__docformat__ = 'reStructuredText'
+
+
+class FenwickTree:
+    """
+        Fenwick Tree.
+
+        attributes:
+            length: number of values stored in the tree
+            tree: 1-indexed internal array of partial sums
+    """
+
+    def __init__(self, values: list[float]) -> None:
+        """
+            Build the tree from a list of values.
+            :complexity: O(N) where N is the number of values
+        """
+        self.length = len(values)
+        self.tree = [0] + list(values)
+        for i in range(1, self.length + 1):
+            parent = i + (i & -i)
+            if parent <= self.length:
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self) -> int:
+        """
+            Returns the number of values stored in the tree
+            :complexity: O(1)
+        """
+        return self.length
+
+    def add(self, index: int, delta: float) -> None:
+        """
+            Add delta to the value at (0-indexed) index.
+            :complexity: O(log N)
+        """
+        i = index + 1
+        while i <= self.length:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count: int) -> float:
+        """
+            Returns the sum of the first count values.
+            :complexity: O(log N)
+        """
+        total = 0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def search(self, target: float) -> tuple[int, float]:
+        """
+            Find the largest count such that the sum of the first count values is below target.
+            Values must be non negative, so that prefix sums never decrease.
+            :return: count and the sum of the first count values
+            :complexity: O(log N)
+        """
+        position = 0
+        total = 0
+        step = 1
+        while step * 2 <= self.length:
+            step *= 2
+        while step > 0:
+            if position + step <= self.length and total + self.tree[position + step] < target:
+                position += step
+                total += self.tree[position]
+            step //= 2
+        return position, total
+
+
+if __name__ == "__main__":
+    f = FenwickTree([3, 1, 4, 1, 5])
+    print(f.prefix(3))
+    print(f.search(8))
+    f.add(1, 2)
+    print(f.prefix(5))
+    print(f.search(8))
+
+    # Prefix sums and searches must match a plain list after random point updates
+    from random_gen import RandomGen
+    rng = RandomGen(2022)
+    for size in range(0, 40):
+        values = [rng.randint(0, 20) for _ in range(size)]
+        f = FenwickTree(values)
+        for _ in range(50):
+            if size > 0:
+                index = rng.randint(0, size - 1)
+                delta = rng.randint(-values[index], 20)
+                values[index] += delta
+                f.add(index, delta)
+            for count in range(size + 1):
+                assert f.prefix(count) == sum(values[:count])
+            target = rng.randint(0, sum(values) + 5)
+            count = 0
+            while count < size and sum(values[:count + 1]) < target:
+                count += 1
+            assert f.search(target) == (count, sum(values[:count])), (values, target)
+    print("FenwickTree matches a list")
@@ -147,11 +147,14 @@ class Food:
         return f"{self.name} {self.hunger_bars} {self.price}"
 
     @classmethod
-    def random_food(cls) -> Food:
+    def random_food(cls, rng: RandomGen | None = None) -> Food:
         """
         
         A Class method that returns a random Food Object
 
+        Parameters:
+            rng (RandomGen | None): The random stream to draw from, defaults to the RandomGen class stream
+
         Returns:
             A random Food Object
         
@@ -162,12 +165,13 @@ class Food:
             O(1)
         """
         
+        rng = RandomGen if rng is None else rng
         # name of food
-        food_name = FOOD_NAMES[RandomGen.randint(0,len(FOOD_NAMES)-1)]
+        food_name = FOOD_NAMES[rng.randint(0,len(FOOD_NAMES)-1)]
         # hunger_bars for food
-        hunger_bars = RandomGen.randint(100,500)
+        hunger_bars = rng.randint(100,500)
         # price for food
-        food_price = RandomGen.randint(10,40)
+        food_price = rng.randint(10,40)
 
         return Food(food_name,hunger_bars,food_price)
 
@@ -8,6 +8,8 @@ October 2022
 
 __author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
 
+import random_gen
+from typing import Iterator
 from player import Player
 from trader import Trader, RandomTrader, RangeTrader, HardTrader
 from material import Material
@@ -15,8 +17,13 @@ from cave import Cave
 from food import Food
 from random_gen import RandomGen
 from hash_table import LinearProbeTable
-from heap import MaxHeapTuple
+from heap import IndexedMaxHeap
 from aset import ASet
+from world import World
+from market import Market
+from planner import EfficiencyRanking, max_prices, select_scenarios
+from stats import PlannerStats
+from sinks import Sink
 from constants import EPSILON
 
 
@@ -32,11 +39,18 @@ class Game:
         MAX_CAVES (int): An integer representing the maximum amount of cave objects
         MIN_TRADERS (int): An integer representing the minimum amount of trader objects
         MAXTRADERS (int): An integer representing the maximum amount of trader objects
+        BULK_DRAW_CAVES (int): The number of caves from which finish_day draws for all caves in one call (measured crossover)
 
     Instance Attributes:
         materials (None |  of Material Objects): A collection of Material Objects pertaining to the instantiation of the game object
         traders (None |  of Trader Objects): A collection of Trader Objects pertaining to the instantiation of the game object
         caves (None | __ of cave Objects): A collection of Cave Objects pertaining to the instantiation of the game object
+        rng (RandomGen): The random stream every random object, deal and day of the game is drawn from
+        verbose (bool): Whether the game prints its objects, deals, foods and plans to the console
+        world (None | World): The shared view of the materials, caves and traders referenced by every player
+        market (None | Market): The live best price of every material over all trader deals, read by every planner
+        cave_slots (dict[Cave, int]): Cave -> index of that cave in caves, used to apply plundered quantities directly
+        stats (PlannerStats): Per-phase counters and timers for the game wide planners, disabled by default
     """
 
     MIN_MATERIALS = 5
@@ -51,15 +65,27 @@ class Game:
     MIN_FOOD = 2
     MAX_FOOD = 5
 
-    def __init__(self) -> None:
+    BULK_DRAW_CAVES = 32
+
+    def __init__(self, rng: RandomGen | None = None) -> None:
         """"
         
         This is the constructor method for the Game Class, which initialises a new instance of the game object
+
+        Parameters:
+            rng (RandomGen | None): The random stream of the game, defaults to the RandomGen class stream.
+                                    Games with their own stream can run side by side without disturbing each other.
         """
         
+        self.rng = RandomGen if rng is None else rng
         self.materials = None
         self.traders = None
         self.caves = None
+        self.verbose = True
+        self.world = None
+        self.market = None
+        self.cave_slots = {}
+        self.stats = PlannerStats()
 
     def initialise_game(self) -> None:
         """
@@ -67,20 +93,24 @@ class Game:
         This is the method that initialises all game objects: Materials, Caves, Traders.
         """
 
-        N_MATERIALS = RandomGen.randint(self.MIN_MATERIALS, self.MAX_MATERIALS)
+        N_MATERIALS = self.rng.randint(self.MIN_MATERIALS, self.MAX_MATERIALS)
         self.generate_random_materials(N_MATERIALS)
-        print("Materials:\n\t", end="")
-        print("\n\t".join(map(str, self.get_materials())))
+        if self.verbose:
+            print("Materials:\n\t", end="")
+            print("\n\t".join(map(str, self.get_materials())))
 
-        N_CAVES = RandomGen.randint(self.MIN_CAVES, self.MAX_CAVES)
+        N_CAVES = self.rng.randint(self.MIN_CAVES, self.MAX_CAVES)
         self.generate_random_caves(N_CAVES)
-        print("Caves:\n\t", end="")
-        print("\n\t".join(map(str, self.get_caves())))
+        if self.verbose:
+            print("Caves:\n\t", end="")
+            print("\n\t".join(map(str, self.get_caves())))
 
-        N_TRADERS = RandomGen.randint(self.MIN_TRADERS, self.MAX_TRADERS)
+        N_TRADERS = self.rng.randint(self.MIN_TRADERS, self.MAX_TRADERS)
         self.generate_random_traders(N_TRADERS)
-        print("Traders:\n\t", end="")
-        print("\n\t".join(map(str, self.get_traders())))
+        if self.verbose:
+            print("Traders:\n\t", end="")
+            print("\n\t".join(map(str, self.get_traders())))
+        self.build_world()
 
     def initialise_with_data(self, materials: list[Material], caves: list[Cave], traders: list[Trader]):
         """
@@ -96,6 +126,30 @@ class Game:
         self.set_materials(materials)
         self.set_caves(caves)
         self.set_traders(traders)
+        self.build_world()
+
+    def build_world(self) -> None:
+        """
+        
+        This method builds the Market and the shared World from the current materials, caves and traders,
+        and points every player at it
+        """
+
+        if self.market is not None:
+            self.market.detach()
+        self.market = Market(self.materials, self.traders)
+        self.market.listeners.append(self.notify_price_changed)
+        self.world = World(self.materials, self.caves, self.traders, self.market)
+        self.share_world()
+
+    def share_world(self) -> None:
+        """
+        
+        This method points every player at the shared World, so no player keeps its own copy of the tables
+        """
+
+        for player in self.get_players():
+            player.set_world(self.world)
 
     def set_materials(self, mats: list[Material]) -> None:
         """
@@ -107,6 +161,11 @@ class Game:
         """
         
         self.materials = mats
+        if self.market is not None:
+            self.market.set_materials(mats)
+        if self.world is not None:
+            self.world.rebind(materials=mats)
+            self.share_world()
 
     def set_caves(self, caves: list[Cave]) -> None:
         """
@@ -118,6 +177,12 @@ class Game:
         """
         
         self.caves = caves
+        self.cave_slots = {}
+        for i in range(len(caves)):
+            self.cave_slots[caves[i]] = i
+        if self.world is not None:
+            self.world.rebind(caves=caves)
+            self.share_world()
 
     def set_traders(self, traders: list[Trader]) -> None:
         """
@@ -132,6 +197,11 @@ class Game:
             if trader.deal is None:
                 trader.generate_deal()
         self.traders = traders
+        if self.market is not None:
+            self.market.set_traders(traders)
+        if self.world is not None:
+            self.world.rebind(traders=traders)
+            self.share_world()
 
     def get_materials(self) -> list[Material]:
         """
@@ -166,6 +236,154 @@ class Game:
         
         return self.traders
 
+    def get_players(self) -> list[Player]:
+        """
+        
+        This is the method that gets the players of the game
+
+        Returns:
+            A list of the Player Objects in the game
+        """
+        
+        return []
+
+    def notify_cave_changed(self, cave: Cave) -> None:
+        """
+        
+        This method tells every player that the quantity of a cave has changed, so their planners stay up to date
+
+        Parameters:
+            cave (Cave): The cave whose quantity has changed
+
+        :raises ValueError: if cave is not one of the game's caves, before any player is told
+        """
+        
+        if cave not in self.cave_slots:
+            raise ValueError(f"{cave.name} is not a cave of this game")
+        for player in self.get_players():
+            player.update_cave(cave)
+
+    def notify_price_changed(self, material_name: str, price: float) -> None:
+        """
+        
+        This method tells every player that the best price of a material has changed, so their planners stay up to date.
+        It is called by the Market whenever a trader deal changes the best price of a material.
+
+        Parameters:
+            material_name (str): The name of the material whose best price has changed
+            price (float): The new best price of the material
+        """
+        
+        for player in self.get_players():
+            player.update_price(material_name, price)
+
+    def max_prices(self) -> LinearProbeTable:
+        """
+        
+        This method gets the best price of every material over all trader deals
+
+        Returns:
+            The live best price table of the Market (read-only), or a freshly built table if there is no market yet
+
+        :complexity: O(1) with a market, otherwise O(M + T) where M = #Materials, T = #Traders
+        """
+        
+        if self.market is not None:
+            return self.market.prices
+        return max_prices(self.world.traders, self.world.materials)
+
+    def apply_plunder(self, plundered: list[tuple[Cave | None, float]]) -> None:
+        """
+        
+        This method applies a whole day of plundering to the caves as one batched update.
+        The quantities mined from each cave are summed first through the cave -> slot index, which checks every cave
+        before anything is changed, then each touched cave is reduced once, clamped at zero, and its change is reported
+        to the players.
+
+        Parameters:
+            plundered (list[tuple[Cave | None, float]]): Pairs of cave and quantity mined from it, (None, 0) entries are skipped
+
+        :raises ValueError: if a plundered cave is not one of the game's caves, leaving every cave and player untouched
+        :complexity: O(P + K) where P is the number of pairs and K the number of caves plundered
+        """
+        
+        mined = {}
+        for cave, quantity_mined in plundered:
+            if cave is None:
+                continue
+            if cave not in self.cave_slots:
+                raise ValueError(f"{cave.name} is not a cave of this game")
+            slot = self.cave_slots[cave]
+            mined[slot] = mined.get(slot, 0) + quantity_mined
+        for slot, quantity_mined in mined.items():
+            cave = self.caves[slot]
+            if quantity_mined <= cave.quantity:
+                cave.quantity -= quantity_mined
+            else:
+                cave.quantity = 0
+            self.notify_cave_changed(cave)
+
+    def select_for_balances(self, balances: list[float], foods: list[Food]) -> tuple[list[Food|None], list[float], list[list[tuple[Cave, float]]]]:
+        """
+        
+        This method plans the day for many independent solo players sharing this world, each with its own balance.
+        Every player sees the same materials, caves, traders and food menu, so one EfficiencyRanking (a single sort and
+        one set of prefix sums) is shared, and each player only pays a binary search on its affordability cut-off.
+        Cave quantities are not changed, each plan is computed as if the player were alone in the world.
+
+        Parameters:
+            balances (list[float]): The emeralds available to each player
+            foods (list[Food]): The foods on offer to every player
+
+        Returns:
+            The food purchased, the balance after the day and the caves plundered, for each balance in order
+
+        :pre: The world must be initialised
+        :complexity: O(M + T + C + M log M + F log F + F log M + P log F + K), where P is the number of balances
+                     and K the number of caves in the distinct plans
+        """
+
+        ranking = EfficiencyRanking(self.world.caves, self.max_prices())
+        player_food = []
+        player_emeralds = []
+        player_caves_plundered = []
+        for balance, (food, emeralds, caves) in zip(balances, ranking.select_batch(foods, balances)):
+            player_food.append(food)
+            player_emeralds.append(balance + emeralds)
+            player_caves_plundered.append(caves)
+        return player_food, player_emeralds, player_caves_plundered
+
+    def select_for_price_scenarios(self, price_matrix: list[list[float]], foods: list[Food], balance: float,
+                                   materials: list[Material] | None = None) -> tuple[list[Food|None], list[float], list[list[tuple[Cave, float]]]]:
+        """
+        
+        This method evaluates what a solo player would do under many hypothetical trader price vectors at once,
+        for risk analysis. No trader deal, cave or player is changed.
+
+        Parameters:
+            price_matrix (list[list[float]]): One row per scenario, holding the best selling price of each material
+            foods (list[Food]): The foods on offer
+            balance (float): The emeralds available to the player
+            materials (list[Material] | None): The material of each column of price_matrix, defaults to the world's materials
+
+        Returns:
+            The food purchased, the balance after the day and the caves plundered, for each scenario in order
+
+        :pre: The world must be initialised
+        :see: planner.select_scenarios
+        """
+
+        materials = self.world.materials if materials is None else materials
+        names = [material.name for material in materials]
+        scenario_food = []
+        scenario_emeralds = []
+        scenario_caves_plundered = []
+        for food, emeralds, caves in select_scenarios(self.world.caves, names, price_matrix, foods, balance):
+            scenario_food.append(food)
+            scenario_emeralds.append(balance + emeralds)
+            scenario_caves_plundered.append(caves)
+        return scenario_food, scenario_emeralds, scenario_caves_plundered
+
     def generate_random_materials(self, amount):
         """
         This Method generates a random value for the material instance attribute
@@ -190,13 +408,13 @@ class Game:
             # 4) append output_material_list with material_to_be_added
             # 5) Set and end
 
-             material_to_be_added = Material.random_material()
+             material_to_be_added = Material.random_material(self.rng)
              filter_list.append(material_to_be_added.name)
              filter_list.append(material_to_be_added.mining_rate)
 
              if output_material_list != []:
                  while material_to_be_added.mining_rate in filter_list or material_to_be_added.name in filter_list:
-                    material_to_be_added = Material.random_material()   
+                    material_to_be_added = Material.random_material(self.rng)   
                  output_material_list.append(material_to_be_added)
                  filter_list.append(material_to_be_added.name)
                  filter_list.append(material_to_be_added.mining_rate)
@@ -218,14 +436,14 @@ class Game:
         cave_list = []
         filter_list = []
         for _ in range(amount):
-            cave_to_be_added = Cave.random_cave(self.materials)
+            cave_to_be_added = Cave.random_cave(self.materials, self.rng)
 
             if cave_list != []:
 
                 filter_list.append(cave_to_be_added.name)
 
                 while cave_to_be_added.name in filter_list:
-                    cave_to_be_added = Cave.random_cave(self.materials)
+                    cave_to_be_added = Cave.random_cave(self.materials, self.rng)
 
                 cave_list.append(cave_to_be_added)
 
@@ -247,7 +465,7 @@ class Game:
             amount (int): An integer representing the number of random materials to generate
         """
 
-        trader_index_int = RandomGen.randint(0, 2)
+        trader_index_int = self.rng.randint(0, 2)
         trader_class = ['RandomTrader', 'RangeTrader', 'HardTrader']
         rand_trader_class = trader_class[trader_index_int]
 
@@ -255,14 +473,14 @@ class Game:
         for _ in range(amount):
             material_list_trader = []
             for material in self.materials:
-                if RandomGen.random_chance(0.5):
+                if self.rng.random_chance(0.5):
                     material_list_trader.append(material)
             if rand_trader_class == 'RandomTrader':
-                trader = RandomTrader.random_trader()
+                trader = RandomTrader.random_trader(self.rng)
             elif rand_trader_class == 'RangeTrader':
-                trader = RangeTrader.random_trader()
+                trader = RangeTrader.random_trader(self.rng)
             else:
-                trader = HardTrader.random_trader()
+                trader = HardTrader.random_trader(self.rng)
             trader.set_all_materials(material_list_trader)
             trader.generate_deal()
             traders_list.append(trader)
@@ -271,15 +489,106 @@ class Game:
     def finish_day(self):
         """
 
-        This method simulates the end of the Minecraft Day
+        This method simulates the end of the Minecraft Day.
+        Every cave takes at most two draws (a chance, then an amount). From BULK_DRAW_CAVES caves on, and only with
+        NumPy, they are all drawn in one call and the ones left over are handed back to the stream, so the sequence
+        matches drawing one at a time. Below that the fixed cost of the bulk call is more than it saves.
         """
 
-        for cave in self.get_caves():
-            if cave.quantity > 0 and RandomGen.random_chance(0.2):
-                cave.remove_quantity(RandomGen.random_float() * cave.quantity)
+        caves = self.get_caves()
+        if len(caves) < self.BULK_DRAW_CAVES or random_gen.np is None:
+            for cave in caves:
+                if cave.quantity > 0 and self.rng.random_chance(0.2):
+                    cave.remove_quantity(self.rng.random_float() * cave.quantity)
+                else:
+                    cave.add_quantity(round(self.rng.random_float() * 10, 2))
+                cave.quantity = round(cave.quantity, 2)
+                self.notify_cave_changed(cave)
+            return
+        draws = self.rng.random_float_array(2 * len(caves)).tolist()
+        used = 0
+        for cave in caves:
+            removing = False
+            if cave.quantity > 0:
+                removing = draws[used] < 0.2
+                used += 1
+            amount = draws[used]
+            used += 1
+            if removing:
+                cave.remove_quantity(amount * cave.quantity)
             else:
-                cave.add_quantity(round(RandomGen.random_float() * 10, 2))
+                cave.add_quantity(round(amount * 10, 2))
             cave.quantity = round(cave.quantity, 2)
+            self.notify_cave_changed(cave)
+        self.rng.jump(used - len(draws))
+
+    def run(self, days: int, sink: Sink | None = None) -> Sink | None:
+        """
+        
+        This method runs the game headless for a number of days: each day is simulated (plans are chosen and applied)
+        and then finished, with console output turned off. The record of each day is handed to sink, if any.
+
+        Parameters:
+            days (int): The number of days to simulate
+            sink (Sink | None): Receives one structured record per day (see sinks.Sink), closed after the last day
+
+        Returns:
+            The sink passed in
+
+        :pre: The game must be initialised, only SoloGame and MultiplayerGame can simulate days
+        :complexity: O(days * D) where D is the cost of simulating and finishing one day
+        """
+        
+        verbose = self.verbose
+        self.verbose = False
+        try:
+            for day in range(days):
+                results = self.simulate_day()
+                self.finish_day()
+                if sink is not None:
+                    sink.write(self.day_record(day, results))
+        finally:
+            self.verbose = verbose
+            if sink is not None:
+                sink.close()
+        return sink
+
+    def day_record(self, day: int, results: tuple) -> dict:
+        """
+        
+        This method turns the results of simulate_day into the structured record handed to a sink.
+        The base record only holds the day and each player's balance, SoloGame and MultiplayerGame override it
+        to add the foods bought and the caves plundered.
+
+        Parameters:
+            day (int): The index of the day in the run
+            results (tuple): What simulate_day returned
+
+        Returns:
+            A dict of plain values, as described in sinks.Sink
+        """
+        
+        players = []
+        for player in self.get_players():
+            players.append(self.player_record(player, None, player.balance, []))
+        return {"day": day, "foods": [], "players": players}
+
+    @staticmethod
+    def player_record(player: Player, food: Food | None, balance: float, caves: list[tuple[Cave | None, float]]) -> dict:
+        """
+        
+        This method builds the part of a day record describing one player's plan
+
+        Returns:
+            A dict holding the player's name, the food bought, the balance after the day and the caves plundered
+        """
+        
+        return {
+            "name": player.name,
+            "food": None if food is None else food.name,
+            "balance": balance,
+            "caves": [[cave.name, quantity] for cave, quantity in caves if cave is not None],
+        }
 
 
 class SoloGame(Game):
@@ -295,6 +604,18 @@ class SoloGame(Game):
         player (Player Object): A PLayer Object representing the solo player in the Solo Minecraft Game
     """
 
+    def __init__(self, rng: RandomGen | None = None) -> None:
+        """
+        
+        The constructor method for the SoloGame Child Class of the Game Parent Class
+
+        Parameters:
+            rng (RandomGen | None): The random stream of the game, defaults to the RandomGen class stream
+        """
+
+        super().__init__(rng)
+        self.player = None
+
     def initialise_game(self) -> None:
         """
             
@@ -302,10 +623,8 @@ class SoloGame(Game):
         """
 
         super().initialise_game()
-        self.player = Player.random_player()
-        self.player.set_materials(self.get_materials())
-        self.player.set_caves(self.get_caves())
-        self.player.set_traders(self.get_traders())
+        self.player = Player.random_player(self.rng)
+        self.player.set_world(self.world)
 
     def initialise_with_data(self, materials: list[Material], caves: list[Cave], traders: list[Trader],
                              player_names: list[str], emerald_info: list[float]):
@@ -323,32 +642,68 @@ class SoloGame(Game):
 
         super().initialise_with_data(materials, caves, traders)
         self.player = Player(player_names[0], emeralds=emerald_info[0])
-        self.player.set_materials(self.get_materials())
-        self.player.set_caves(self.get_caves())
-        self.player.set_traders(self.get_traders())
+        self.player.set_world(self.world)
+
+    def get_players(self) -> list[Player]:
+        """
+        
+        This method gets the solo player of the game
+
+        Returns:
+            A list holding the solo Player Object (empty before the game is initialised)
+        """
+
+        return [] if self.player is None else [self.player]
 
     def simulate_day(self):
         """
         
         This method simulates a day of the Solo Minecraft Game
+
+        Returns:
+            The foods offered, then the food bought, the balance after the day and the caves plundered by the player
         """
 
         # 1. Traders make deals
-        print("Traders Deals:\n\t", end="")
-        print("\n\t".join(map(str, self.get_traders())))
+        if self.verbose:
+            print("Traders Deals:\n\t", end="")
+            print("\n\t".join(map(str, self.get_traders())))
         # 2. Food is offered
-        food_num = RandomGen.randint(self.MIN_FOOD, self.MAX_FOOD)
+        food_num = self.rng.randint(self.MIN_FOOD, self.MAX_FOOD)
         foods = []
         for _ in range(food_num):
-            foods.append(Food.random_food())
-        print("\nFoods:\n\t", end="")
-        print("\n\t".join(map(str, foods)))
+            foods.append(Food.random_food(self.rng))
+        if self.verbose:
+            print("\nFoods:\n\t", end="")
+            print("\n\t".join(map(str, foods)))
         self.player.set_foods(foods)
         # 3. Select one food item to purchase
         food, balance, caves = self.player.select_food_and_caves()
-        print(food, balance, caves)
+        if self.verbose:
+            print(food, balance, caves)
         # 4. Quantites for caves is updated, some more stuff is added.
         self.verify_output_and_update_quantities(food, balance, caves)
+        return foods, food, balance, caves
+
+    def day_record(self, day: int, results: tuple) -> dict:
+        """
+        
+        This method turns the results of simulate_day into the structured record handed to a sink
+
+        Parameters:
+            day (int): The index of the day in the run
+            results (tuple): What simulate_day returned
+
+        Returns:
+            A dict of plain values, as described in sinks.Sink
+        """
+        
+        foods, food, balance, caves = results
+        return {
+            "day": day,
+            "foods": [offered.name for offered in foods],
+            "players": [self.player_record(self.player, food, balance, caves)],
+        }
 
     def verify_output_and_update_quantities(self, food: Food | None, balance: float,
                                             caves: list[tuple[Cave, float]]) -> None:
@@ -362,21 +717,14 @@ class SoloGame(Game):
             caves (list[tuple[Cave, float]]): A list of paired Cave's and decimal quantity mined from those caves
         """
 
-        if food.price > self.player.balance and caves != []:
+        if food is not None and food.price > self.player.balance and caves != []:
             raise ValueError("Insufficient funds")
 
-        self.player.balance = balance
-
-        for i in range(len(caves)):
-            # caves is a list of tuple elements where the tuples consist of (material_mined, quantity_mined)
-            material_of_cave = caves[i][0].material.name  # material object
-            quantity_mined = caves[i][1]  # quantity mined
+        # caves is a list of tuple elements where the tuples consist of (cave, quantity_mined)
+        # Applied directly through the cave -> slot index, O(C). Checked before the balance changes.
+        self.apply_plunder(caves)
 
-            if self.caves[i].material.name == material_of_cave:
-                if quantity_mined <= self.caves[i].quantity:
-                    self.caves[i].quantity -= quantity_mined
-                else:
-                    self.caves[i].quantity = 0
+        self.player.balance = balance
 
 
 class MultiplayerGame(Game):
@@ -397,13 +745,16 @@ class MultiplayerGame(Game):
     MIN_PLAYERS = 2
     MAX_PLAYERS = 5
 
-    def __init__(self) -> None:
+    def __init__(self, rng: RandomGen | None = None) -> None:
         """
         
         The constructor method for the MultiplayerGame Child Class of the Game Parent Class
+
+        Parameters:
+            rng (RandomGen | None): The random stream of the game, defaults to the RandomGen class stream
         """
 
-        super().__init__()
+        super().__init__(rng)
         self.players = []
 
     def initialise_game(self) -> None:
@@ -413,14 +764,12 @@ class MultiplayerGame(Game):
         """
 
         super().initialise_game()
-        N_PLAYERS = RandomGen.randint(self.MIN_PLAYERS, self.MAX_PLAYERS)
+        N_PLAYERS = self.rng.randint(self.MIN_PLAYERS, self.MAX_PLAYERS)
         self.generate_random_players(N_PLAYERS)
-        for player in self.players:
-            player.set_materials(self.get_materials())
-            player.set_caves(self.get_caves())
-            player.set_traders(self.get_traders())
-        print("Players:\n\t", end="")
-        print("\n\t".join(map(str, self.players)))
+        self.share_world()
+        if self.verbose:
+            print("Players:\n\t", end="")
+            print("\n\t".join(map(str, self.players)))
 
     def generate_random_players(self, amount) -> None:
         """
@@ -432,7 +781,18 @@ class MultiplayerGame(Game):
         """
         
         for _ in range(amount):
-            self.players.append(Player.random_player())
+            self.players.append(Player.random_player(self.rng))
+
+    def get_players(self) -> list[Player]:
+        """
+        
+        This method gets the players of the MultiplayerGame Object
+
+        Returns:
+            The list of Player Objects
+        """
+
+        return self.players
 
     def initialise_with_data(self, materials: list[Material], caves: list[Cave], traders: list[Trader],
                              player_names: list[str], emerald_info: list[float]):
@@ -452,33 +812,58 @@ class MultiplayerGame(Game):
         super().initialise_with_data(materials, caves, traders)
         for player, emerald in zip(player_names, emerald_info):
             self.players.append(Player(player, emeralds=emerald))
-            self.players[-1].set_materials(self.get_materials())
-            self.players[-1].set_caves(self.get_caves())
-            self.players[-1].set_traders(self.get_traders())
-        print("Players:\n\t", end="")
-        print("\n\t".join(map(str, self.players)))
+        self.share_world()
+        if self.verbose:
+            print("Players:\n\t", end="")
+            print("\n\t".join(map(str, self.players)))
 
     def simulate_day(self):
         """
         
-        This method simulates a day of the Solo Minecraft Game
+        This method simulates a day of the Multiplayer Minecraft Game
+
+        Returns:
+            The food offered, then the food bought, the balance after the day and the cave plundered for each player
         """
 
         # 1. Traders make deals
-        print("Traders Deals:\n\t", end="")
-        print("\n\t".join(map(str, self.get_traders())))
+        if self.verbose:
+            print("Traders Deals:\n\t", end="")
+            print("\n\t".join(map(str, self.get_traders())))
         # 2. Food is offered
-        offered_food = Food.random_food()
-        print(f"\nFoods:\n\t{offered_food}")
+        offered_food = Food.random_food(self.rng)
+        if self.verbose:
+            print(f"\nFoods:\n\t{offered_food}")
         # 3. Each player selects a cave - The game does this instead.
         foods, balances, caves = self.select_for_players(offered_food)
         # 4. Quantities for caves is updated, some more stuff is added.
         self.verify_output_and_update_quantities(foods, balances, caves)
+        return offered_food, foods, balances, caves
+
+    def day_record(self, day: int, results: tuple) -> dict:
+        """
+        
+        This method turns the results of simulate_day into the structured record handed to a sink
+
+        Parameters:
+            day (int): The index of the day in the run
+            results (tuple): What simulate_day returned
+
+        Returns:
+            A dict of plain values, as described in sinks.Sink
+        """
+        
+        offered_food, foods, balances, caves = results
+        players = []
+        for i in range(len(self.players)):
+            players.append(self.player_record(self.players[i], foods[i], balances[i], [caves[i]]))
+        return {"day": day, "foods": [offered_food.name], "players": players}
 
     def select_for_players(self, food: Food) -> tuple[list[Food|None], list[float], list[tuple[Cave, float]|None]]:
 
         """
         Approach:
+        If the game has a Market, its live best price table is read instead of Steps 1-3, in O(1).
         Step 1: From a player, pull the traders and materials
         Step 2: Initialise a hash table, and iterate through all trader deals.
                 If a material is not in, just insert material and its corresponding price.
@@ -495,7 +880,7 @@ class MultiplayerGame(Game):
                 For each cave, calculate the emeralds gained from mining the cave (ignoring food price).
                 This is the min(cave quantity, or the hunger bars / mining_rate of the material) * price of material.
                 Save this result into a variable (called mineable).
-                Append cave array with (mineable, (cave, cave_capacity)).
+                Append cave array with (mineable, cave), and remember the quantity remaining in each cave.
                 This step will take O(C) time, where C is the amount of caves.
                 E.g if prismarine has price of $10, cave quantity is 15 and food has 100 hunger bars
                     We can only mine hunger bars / material.mining_rate at most.
@@ -503,39 +888,41 @@ class MultiplayerGame(Game):
                     Take the lower of quantity mineable and quantity in the cave. In this case, the cave quantity is 15
                     So the lower is 10.
                     we can only get 10*10 = 100 emeralds
-                    example_array = [(100, (Prismarine,15)), (40, (Gold,6)), (0, (Iron,11.1)]
+                    example_array = [(100, Prismarine cave), (40, Gold cave), (0, Iron cave)]
 
-        Step 5: Initialise a max heap, which has been modified to take in a (key, item) pair.
+        Step 5: Initialise an indexed max heap, which takes in a (key, cave) pair and keeps the position of each cave,
+                so every cave is in the heap exactly once and its key can be changed in place.
                 Using the cave array, create the heap bottom up.
                 Root node has the cave with the highest amount of emeralds earned for mining it (wrt to food given).
                 This step will take O(C) time, where C is the amount of caves
 
         Step 6: Then, we iterate through each player and check if they can afford the food.
                 If they can afford the food, continue, otherwise just update with None.
-                Then, get the most efficient cave by calling get_max with the heap.
+                Then, look at the most efficient cave by calling peek with the heap.
                 Save the results, and what we do with them depends on:
                 If the player loses emeralds mining the cave:
                     Update with None
-                    Reinsert the most efficient cave into the heap.
-                    This will take O(log C) time, due to insertion.
+                    The cave stays in the heap untouched.
+                    This will take O(1) time.
 
                 Elif the player mines the entire cave
-                    Simply just update caves_plundered with the cave and the cave quantity
+                    Simply just update caves_plundered with the cave and the quantity remaining in it
                     Update emeralds earned with max_emeralds + player balance
-                    This will take O(1) time.
+                    Remove the cave from the heap with get_max.
+                    This will take O(log C) time.
 
                 Elif the player partially mines the cave:
                     We find the quantity remaining in the cave, and save the difference
                     Update caves_plundered with the cave and the difference.
-                    Update the cave quantity with the quantity remaining.
+                    Update the quantity remaining in the cave.
                     Update the caves' mineable;
                     This is the min(cave quantity, or the hunger bars / mining_rate of the material) * price of material.
-                    Reinsert the cave into the heap
-                    This will take O(log C) time, due to insertion.
+                    Decrease the key of the cave in the heap to the new mineable
+                    This will take O(log C) time, due to sinking.
 
                 For example:
                     Steve has 14 emeralds and can afford Raw Beef which has a price of 10 emeralds and 100 hunger bars.
-                    Calling get_max, we pull res = (100, (Prismarine,15)).
+                    Calling peek, we see res = (100, Prismarine cave), which has 15 remaining.
                     Our emerald gain, or mineable, is res[0] = 100
                     Then, calculate the quantity lost by dividing the emerald gain by mining_rate, which is 10.
                     Since the cave would still have 5 emeralds left, we go to the partially mined case.
@@ -544,9 +931,9 @@ class MultiplayerGame(Game):
                     Our quantity is now 15-10, 5, so mineable based on cave capacity is 5*10 = 50
                     Take the lower of quantity mineable and quantity in the cave.
                     This will be 5 * 10 = 50
-                    So our new quantity is 5, we update this into a temporary variable.
-                    Then, we reinsert this cave into the max heap.
-                    cave_heap.add(50,(cave,5))
+                    So our new quantity is 5, we update this in the remaining quantities.
+                    Then, we decrease the key of this cave in the max heap.
+                    cave_heap.update(cave, 50)
                     Calculate our results
                     player_caves_plundered.append(Cave, 10)
                     player_food.append(Raw Beef)
@@ -558,129 +945,143 @@ class MultiplayerGame(Game):
         :return: player_food, a list containing what food was bought for each player
                 player_emeralds, a list containing emerald balances for each player
                 player_caves_plundered a list containing cave plundered and amount mined for each player
+        The allocations are produced by iter_select_for_players, this method only collects them into lists.
+        When self.stats is enabled, the max_prices, caves, heap_build and players phases are recorded.
         :complexity: O(M + T + C + P * log C), where M=#Materials, T=#Traders, C=#Caves, P=#Players.
+                     O(C + P * log C) with a Market.
 
         """
-        # Initialise result lists
-        player_emeralds = []
         player_food = []
+        player_emeralds = []
         player_caves_plundered = []
+        for food_bought, balance, cave_plundered in self.iter_select_for_players(food):
+            player_food.append(food_bought)
+            player_emeralds.append(balance)
+            player_caves_plundered.append(cave_plundered)
+        return player_food, player_emeralds, player_caves_plundered
 
-        # Get traders from first player
-        max_prices = LinearProbeTable(len(self.players[0].traders))
-        traders_in_game = self.players[0].traders
-        materials_in_game = self.players[0].material
-        caves_in_game = self.players[0].caves
+    def iter_select_for_players(self, food: Food) -> Iterator[tuple[Food|None, float, tuple[Cave, float]|tuple[None, int]]]:
+        """
+        Streaming version of select_for_players, yielding (food bought, balance, (cave plundered, quantity mined))
+        for each player in order as soon as it is decided, so peak memory does not grow with the number of players.
+        Caves are only read, the quantity left in each cave is tracked inside the generator,
+        so a consumer may apply each allocation (e.g. through apply_plunder) before asking for the next one.
 
-        # Finding max prices O(T + M)
-        # Iterate through all materials sold by traders, add the maximum price for each material into max_prices.
-        for mats in traders_in_game.keys():
-            for deal in traders_in_game[mats]:
-                # In hashtable so add if it is larger
+        :see: #select_for_players(self, food) for the approach
+        :pre: Must have at least 1 player in self.players, with its traders, materials, and caves initialised.
+        :complexity: O(M + T + C) before the first allocation, then O(log C) per player.
+        """
+        mark = self.stats.start()
+        caves_in_game = self.players[0].caves
+        if self.market is not None:
+            # The market keeps the best price of every material up to date as deals change, O(1)
+            best_prices = self.market.prices
+        else:
+            # Get traders from first player
+            best_prices = LinearProbeTable(len(self.players[0].traders))
+            traders_in_game = self.players[0].traders
+            materials_in_game = self.players[0].material
+
+            # Finding max prices O(T + M)
+            # Iterate through all materials sold by traders, add the maximum price for each material into best_prices.
+            for mats in traders_in_game.keys():
+                for deal in traders_in_game[mats]:
+                    # In hashtable so add if it is larger
+                    try:
+                        if best_prices[mats] < deal:
+                            best_prices[mats] = deal
+                    # Not in hashtable so just insert it
+                    except KeyError:
+                        best_prices[mats] = deal
+
+            # If not selling material, add into max price as 0
+            for material in materials_in_game:
                 try:
-                    if max_prices[mats] < deal:
-                        max_prices[mats] = deal
-                # Not in hashtable so just insert it
+                    if best_prices[material.name]:
+                        pass
                 except KeyError:
-                    max_prices[mats] = deal
-
-        # If not selling material, add into max price as 0
-        for material in materials_in_game:
-            try:
-                if max_prices[material.name]:
-                    pass
-            except KeyError:
-                max_prices[material.name] = 0
+                    best_prices[material.name] = 0
+        mark = self.stats.stop("max_prices", mark)
         # Get all caves, also create max heap to store
         # Find the max amount of emeralds you can get from cave with the food, let this be heap key
         # Then, store the cave object as the item
         # O(C) time complexity
         cave_array = []
+        remaining = {}
         for mats in caves_in_game.keys():
             for cave in caves_in_game[mats]:
-                price = max_prices[cave.material.name]
+                price = best_prices[cave.material.name]
                 # Finding total emeralds that can be gained from the cave
                 total = price * cave.quantity
                 # Find amount actually mineable with the food from the cave
                 mineable = total
                 if cave.quantity and cave.material.mining_rate:
                     mineable = min(total, food.hunger_bars / (cave.material.mining_rate * cave.quantity) * total)
-                cave_capacity = cave.quantity
-                cave_array.append((mineable, (cave,cave_capacity)))
+                remaining[cave] = cave.quantity
+                cave_array.append((mineable, cave))
+        mark = self.stats.stop("caves", mark)
 
-        # Create heap bottom up, O(C) time complexity
-        cave_heap = MaxHeapTuple(len(cave_array))
+        # Create heap bottom up, one entry per cave, O(C) time complexity
+        cave_heap = IndexedMaxHeap(len(cave_array))
         cave_heap.bottom_up(cave_array)
+        mark = self.stats.stop("heap_build", mark)
 
         # For each player, get most optimal cave
         for player in self.players:
-            if player.balance > food.price:
-                optimal_res = cave_heap.get_max()
-                # Stored as (key, item) -> (emeralds gained wrt to food hunger bar, cave object)
-                max_emeralds = optimal_res[0]
-                max_cave = optimal_res[1][0]
-                max_cave_quantity = optimal_res[1][1]
-                # print(max_cave)
-                # If optimal cave quantity is not the total amount in the cave, reinsert the cave with updated amount.
-                # O(log C) time
-                # If we lose emeralds, just don't mine, and reinsert the max into heap.
+            if player.balance > food.price and len(cave_heap) > 0:
+                # Stored as (key, handle) -> (emeralds gained wrt to food hunger bar, cave object)
+                max_emeralds, max_cave = cave_heap.peek()
+                max_cave_quantity = remaining[max_cave]
+                price = best_prices[max_cave.material.name]
+                # If we lose emeralds, just don't mine, the cave stays in the heap untouched.
                 if max_emeralds - food.price < - EPSILON:
-                    player_food.append(None)
-                    player_emeralds.append(player.balance)
-                    player_caves_plundered.append((None, 0))
-                    cave_heap.add(optimal_res)
+                    yield None, player.balance, (None, 0)
 
-                elif not (max_cave_quantity * max_prices[max_cave.material.name] - max_emeralds < EPSILON):
+                # If the cave is only partially mined, decrease its key to what is left, O(log C) time
+                elif not (max_cave_quantity * price - max_emeralds < EPSILON):
                     # Update new quantity remaining
-                    quantity_lost = max_emeralds / max_prices[max_cave.material.name]
-                    max_cave_quantity = max_cave.quantity - quantity_lost
-                    price = max_prices[max_cave.material.name]
+                    quantity_lost = max_emeralds / price
+                    max_cave_quantity -= quantity_lost
+                    remaining[max_cave] = max_cave_quantity
                     # Update the new max price
                     total = price * max_cave_quantity
                     mineable = total
                     # Avoid division by 0
                     if max_cave.material.mining_rate and max_cave_quantity:
                         mineable = min(total,food.hunger_bars / (max_cave.material.mining_rate * max_cave_quantity) * total)
-                    cave_heap.add((mineable, (max_cave,max_cave_quantity)))
-                    # Update results for the day
-                    player_food.append(food)
-                    player_emeralds.append(player.balance + max_emeralds - food.price)
-                    player_caves_plundered.append((max_cave, quantity_lost))
+                    cave_heap.update(max_cave, mineable)
+                    # Hand out the results for the day
+                    yield food, player.balance + max_emeralds - food.price, (max_cave, quantity_lost)
 
-                # Mined the whole cave
+                # Mined the whole cave, so it leaves the heap
                 else:
-                    player_food.append(food)
-                    player_emeralds.append(player.balance + max_emeralds - food.price)
-                    player_caves_plundered.append((max_cave, max_cave.quantity))
+                    cave_heap.get_max()
+                    remaining[max_cave] = 0
+                    yield food, player.balance + max_emeralds - food.price, (max_cave, max_cave_quantity)
 
-            # Cant afford food :c, just update with None
+            # Cant afford food (or nothing is left to mine) :c, just update with None
             else:
-                player_food.append(None)
-                player_emeralds.append(player.balance)
-                player_caves_plundered.append((None, 0))
+                yield None, player.balance, (None, 0)
 
-        return player_food, player_emeralds, player_caves_plundered
+        self.stats.stop("players", mark)
 
     def verify_output_and_update_quantities(self, foods: list[Food | None], balances: list[float],
                                             caves: list[tuple[Cave, float] | None]) -> None:
         """
-        Verify output of select_for_players
+        Verify output of select_for_players, and apply every player's plunder to the caves as one batched update.
+        The plunder is checked before any balance changes.
 
-        :complexity: O(P * C * O(comp==)) where P is number of players, C is the number of caves plundered 
+        :complexity: O(P + C) where P is number of players, C is the number of caves plundered
         """
+        plundered = []
         for player_index in range(len(self.players)):
-            self.players[player_index].balance = balances[player_index]
             if foods[player_index] and caves[player_index]:
-                for i in range(len(caves[player_index])):
-                    # caves is a list of tuple elements where the tuples consist of (Cave object, quantity_mined)
-                    material_of_cave = caves[player_index][0].material.name  # material name
-                    quantity_mined = caves[player_index][1]  # quantity mined
-                    if self.caves[i].material.name == material_of_cave:
-                        if quantity_mined <= self.caves[i].quantity:
-                            # Update cave quantities
-                            self.caves[i].quantity -= quantity_mined
-                        else:
-                            self.caves[i].quantity = 0
+                # caves is a list of tuple elements where the tuples consist of (Cave object, quantity_mined)
+                plundered.append(caves[player_index])
+        # Checked before any balance changes
+        self.apply_plunder(plundered)
+        for player_index in range(len(self.players)):
+            self.players[player_index].balance = balances[player_index]
 
 if __name__ == "__main__":
     r = RandomGen.seed  # Change this to set a fixed seed.
@@ -777,3 +1178,101 @@ if __name__ == "__main__":
     # (<Cave: Castle Karstaag Ruins. 4 of [Netherite Ingot: 20.95🍗/💎]>, 4)
     # (<Cave: Orotheim. 6 of [Fishing Rod: 26.93🍗/💎]>, 3.7133308577794284)
     # ]
+
+    # finish_day must draw the same sequence with and without the bulk draws
+    for seed in range(20):
+        quantities = []
+        for bulk_draw_caves in (0, 41):  # Bulk, then one at a time for the 40 caves
+            g = SoloGame(RandomGen(seed))
+            g.verbose = False
+            g.MIN_CAVES = g.MAX_CAVES = 40
+            g.BULK_DRAW_CAVES = bulk_draw_caves
+            g.initialise_game()
+            g.caves[0].quantity = 0
+            for _ in range(3):
+                g.finish_day()
+            quantities.append(([cave.quantity for cave in g.caves], g.rng.seed))
+        assert quantities[0] == quantities[1], seed
+    print("finish_day draws the same sequence with and without bulk draws")
+
+    # A foreign cave must be rejected before any balance or cave changes, and a cave plundered twice in a day is
+    # reduced once by the total, clamped at zero
+    bread = Food("Bread", 5, 1)
+    for seed in range(10):
+        g = MultiplayerGame(RandomGen(seed))
+        g.verbose = False
+        g.initialise_game()
+        for player in g.players:
+            player.set_planner(Player.PLANNER_INCREMENTAL)
+            player.set_foods([bread])
+        foreign = Cave("Foreign Cave", g.materials[0], 5)
+        quantities = [cave.quantity for cave in g.caves]
+        balances = [player.balance for player in g.players]
+        plans = [player.select_food_and_caves() for player in g.players]
+        foods = [bread] * len(g.players)
+        for position in range(len(g.players)):
+            plunder = [(g.caves[i % len(g.caves)], 0.5) for i in range(len(g.players))]
+            plunder[position] = (foreign, 0.5)
+            try:
+                g.verify_output_and_update_quantities(foods, [0] * len(g.players), plunder)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("A foreign cave was plundered")
+            assert [cave.quantity for cave in g.caves] == quantities
+            assert [player.balance for player in g.players] == balances
+            assert [player.select_food_and_caves() for player in g.players] == plans
+
+        cave = g.caves[0]
+        cave.quantity = 3
+        g.notify_cave_changed(cave)
+        plunder = [(cave, 1)] * len(g.players)
+        g.verify_output_and_update_quantities(foods, balances, plunder)
+        assert cave.quantity == max(0, 3 - len(g.players)), seed
+
+        s = SoloGame(RandomGen(seed))
+        s.verbose = False
+        s.initialise_game()
+        cave = s.caves[0]
+        cave.quantity = 4
+        try:
+            s.verify_output_and_update_quantities(bread, 0, [(cave, 1), (Cave("Foreign Cave", cave.material, 5), 1)])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("A foreign cave was plundered")
+        assert cave.quantity == 4 and s.player.balance != 0
+        s.verify_output_and_update_quantities(bread, s.player.balance, [(cave, 1.5), (cave, 1.5)])
+        assert cave.quantity == 1
+        s.verify_output_and_update_quantities(bread, s.player.balance, [(cave, 0.75), (cave, 0.75)])
+        assert cave.quantity == 0
+    print("Plunder with a foreign cave changes nothing, a cave plundered twice is reduced once")
+
+    # Streaming the allocations and applying each one before asking for the next must give the same plans,
+    # balances and caves as select_for_players on the same seed
+    for seed in range(30):
+        collected = MultiplayerGame(RandomGen(seed))
+        streamed = MultiplayerGame(RandomGen(seed))
+        for g in (collected, streamed):
+            g.verbose = False
+            g.initialise_game()
+        for day in range(5):
+            food = Food.random_food(collected.rng)
+            assert Food.random_food(streamed.rng).name == food.name
+            foods, balances, caves = collected.select_for_players(food)
+            collected.verify_output_and_update_quantities(foods, balances, caves)
+            allocations = streamed.iter_select_for_players(food)
+            for i in range(len(streamed.players)):
+                food_bought, balance, (cave, quantity) = next(allocations)
+                assert (None if food_bought is None else food_bought.name) == (None if foods[i] is None else foods[i].name)
+                assert balance == balances[i] and quantity == caves[i][1], (seed, day, i)
+                assert (cave is None) == (caves[i][0] is None) and (cave is None or cave.name == caves[i][0].name)
+                if food_bought is not None:
+                    streamed.apply_plunder([(cave, quantity)])
+                streamed.players[i].balance = balance
+            assert next(allocations, None) is None
+            for left, right in zip(collected.caves, streamed.caves):
+                assert abs(left.quantity - right.quantity) < EPSILON, (seed, day, left.name)
+            collected.finish_day()
+            streamed.finish_day()
+    print("iter_select_for_players matches select_for_players with plunder applied as it streams")
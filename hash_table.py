@@ -1,6 +1,6 @@
 """ Hash Table ADT
 
-Defines a Hash Table using Linear Probing for conflict resolution.
+Defines a Hash Table using Linear Probing (optionally Robin Hood) for conflict resolution.
 """
 from __future__ import annotations
 import primes as p
@@ -10,11 +10,15 @@ __docformat__ = 'reStructuredText'
 __modified__ = '21/05/2020'
 __since__ = '14/05/2020'
 
+from functools import lru_cache
 from referential_array import ArrayR
 from typing import TypeVar, Generic
 
 T = TypeVar('T')
 
+# Marks a slot whose item was deleted: lookups probe past it, insertions may reuse it
+TOMBSTONE = object()
+
 '''
     TODO:
     Implement statistics by reading the spec sheet on differences between collision/conflicts. 
@@ -23,28 +27,97 @@ T = TypeVar('T')
 '''
 
 
+def hash_key(key: str, tablesize: int, hash_base: int) -> int:
+    """
+        Hash a key for a table size, used by LinearProbeTable.hash.
+        A pure function of its arguments, so it can be memoised.
+        :complexity: O(K) where K is the size of the key
+    """
+    # Initialise variables
+    a = 1
+    b = 1
+
+    for char in key:
+        # Chain operations such that next value is dependent on the last character.
+        # In this case we update b based on the previous result of h(x).
+        b = (ord(char) + a * b) % tablesize
+        a = a * hash_base % (tablesize - 1)
+    return b
+
+
 class LinearProbeTable(Generic[T]):
     """
         Linear Probe Table.
+        Slots are stored as parallel arrays of keys, values and cached hashes, so a probe compares the stored hash
+        before comparing strings and setting a value doesn't allocate.
 
         attributes:
             count: number of elements in the hash table
-            table: used to represent our internal array
+            slot_keys: key in each slot, None if empty, TOMBSTONE if its item was deleted
+            slot_values: value in each slot
+            slot_hashes: hash (home slot) of the key in each slot, None if empty or a tombstone
             tablesize: current size of the hash table
             primes: prime generator for tablesize
+            hash_base: prime used by hash for the current tablesize
+            tombstones: number of slots holding TOMBSTONE
+            compaction_count: number of times the table was compacted in place
+            robin_hood: whether the table uses Robin Hood insertion and backward-shift deletion
+            max_load: load factor above which an insertion first rehashes the table
+            incremental: whether a rehash migrates the items a few slots at a time instead of all at once
+            old_keys, old_values, old_hashes: the slots of the previous table while migrating, otherwise None
+            old_tablesize: size of the previous table
+            old_count: number of items still in the previous table
+            migrated: number of slots of the previous table migrated so far
+
+        class attributes:
+            slots_probed: total number of slots examined by every table while counting, read by PlannerStats
+            counting: number of enabled PlannerStats, slots are only counted while it is positive
+            hash_bases: tablesize -> hash_base, so the prime search is only done once per table size
+            hash_memo: hash_key behind an LRU cache shared by every table, or None when disabled
+            HASH_MEMO_LIMIT: number of hashes kept in hash_memo, the least recently used are evicted first
+            TOMBSTONE_RATIO: fraction of the table that may hold tombstones before it is compacted
+            MAX_LOAD: max_load of a linear probing table
+            ROBIN_HOOD_MAX_LOAD: max_load of a Robin Hood table
+            MIGRATION_STEP: number of slots of the previous table migrated by each operation of an incremental table
     """
 
-    def __init__(self, expected_size: int, tablesize_override: int = -1) -> None:
+    slots_probed = 0
+    counting = 0
+    hash_bases = {}
+    HASH_MEMO_LIMIT = 4096
+    hash_memo = lru_cache(maxsize=HASH_MEMO_LIMIT)(hash_key)
+    TOMBSTONE_RATIO = 0.25
+    MAX_LOAD = 0.5
+    ROBIN_HOOD_MAX_LOAD = 0.8
+    MIGRATION_STEP = 4
+
+    @classmethod
+    def set_hash_memo(cls, enabled: bool) -> None:
+        """
+            Turn the memo of key hashes (shared by every table) on or off
+            :complexity: O(1)
+        """
+        cls.hash_memo = lru_cache(maxsize=cls.HASH_MEMO_LIMIT)(hash_key) if enabled else None
+
+    def __init__(self, expected_size: int, tablesize_override: int = -1, robin_hood: bool = False,
+                 incremental: bool = False) -> None:
         """
             Initialiser.
             Creates a hash table of some size unless overridden with tablesize_override
             :expected_size: expected size of the hash table
             :tablesize_override: optional argument to override table size
+            :robin_hood: use Robin Hood insertion and backward-shift deletion. Probe lengths vary much less,
+                         so the table is sized for and rehashed at a higher load factor.
+            :incremental: keep the previous slots when rehashing and migrate MIGRATION_STEP of them on each later
+                          get, set or delete, so no single operation reinserts every item
             Complexity:
             Best case: O(1)
             Worst case: O(p) where p is the time taken to generate a prime number
         """
         self.count = 0
+        self.robin_hood = robin_hood
+        self.incremental = incremental
+        self.max_load = self.ROBIN_HOOD_MAX_LOAD if robin_hood else self.MAX_LOAD
         self.tablesize = tablesize_override
         # Initialise iterator, if tablesize_override, skip 1st prime
         self.primes = p.LargestPrimeIterator(tablesize_override, 2)
@@ -53,86 +126,147 @@ class LinearProbeTable(Generic[T]):
             # Need to choose a number big enough to avoid collisions while being space efficient
             # This should be a prime number, and be big enough to avoid most collisions.
             # 2 multiplier, should be sufficient.
-            self.primes = p.LargestPrimeIterator(expected_size * 2, 2)
+            # Robin Hood tables only need enough room to stay under their higher max_load.
+            upper_bound = int(expected_size / self.max_load) + 2 if robin_hood else expected_size * 2
+            self.primes = p.LargestPrimeIterator(upper_bound, 2)
             self.tablesize = self.primes.__next__()
-        self.table = ArrayR(self.tablesize)
+        self._new_slots()
+        self._set_hash_constants()
         # Initialising statistics counters
         self.conflict_count = 0
         self.probe_total = 0
         self.probe_max = 0
         self.rehash_count = 0
+        self.tombstones = 0
+        self.compaction_count = 0
+        # Nothing to migrate until the first rehash
+        self.old_keys = self.old_values = self.old_hashes = None
+        self.old_tablesize = 0
+        self.old_count = 0
+        self.migrated = 0
+
+    def _new_slots(self) -> None:
+        """
+            Allocate empty key, value and hash arrays of the current tablesize
+            :complexity: O(N) where N is the tablesize
+        """
+        self.slot_keys = ArrayR(self.tablesize)
+        self.slot_values = ArrayR(self.tablesize)
+        self.slot_hashes = ArrayR(self.tablesize)
 
-    def hash(self, key: str) -> int:
+    def hash(self, key: str, tablesize: int | None = None) -> int:
         """
             Hash a key for insertion into the hashtable.
             Uses MAD to uniformly distribute keys
             h(x) = [(a*x + b) % p] % N
             a,b: some integer [1, p-1] , p: prime number where p > N , N: hash table size.
+            The hash of a key for a tablesize is memoised in hash_memo (if enabled).
+            :tablesize: hash for this table size (one used before) instead of the current one
+            :see: #hash_key(key: str, tablesize: int, hash_base: int)
+            :complexity: O(1) for a memoised key, otherwise O(K) where K is the size of the key
         """
-        # Initialise variables
-        a = 1
-        b = 1
-        # Initialise iterator to get a larger prime number than tablesize.
-        iterator = p.LargestPrimeIterator(int(self.tablesize * 1.6), 2)
-        hash_base = iterator.__next__()
+        if tablesize is None:
+            tablesize = self.tablesize
+            hash_base = self.hash_base
+        else:
+            hash_base = LinearProbeTable.hash_bases[tablesize]
+        memo = LinearProbeTable.hash_memo
+        if memo is not None:
+            return memo(key, tablesize, hash_base)
+        return hash_key(key, tablesize, hash_base)
 
-        for char in key:
-            # Chain operations such that next value is dependent on the last character.
-            # In this case we update b based on the previous result of h(x).
-            b = (ord(char) + a * b) % self.tablesize
-            a = a * hash_base % (self.tablesize - 1)
-        return b
+    def _set_hash_constants(self) -> None:
+        """
+            Find the prime hash_base for the current tablesize, searched for once per table size
+            :complexity: O(1) for a known table size, otherwise O(p) where p is the time taken to generate a prime number
+        """
+        if self.tablesize not in LinearProbeTable.hash_bases:
+            # Iterator to get a larger prime number than tablesize.
+            iterator = p.LargestPrimeIterator(int(self.tablesize * 1.6), 2)
+            LinearProbeTable.hash_bases[self.tablesize] = iterator.__next__()
+        self.hash_base = LinearProbeTable.hash_bases[self.tablesize]
 
     def statistics(self) -> tuple:
         """
-            Returns a tuple of 4 values:
+            Returns a tuple of 7 values:
             1. Total number of conflicts (conflict_count)
             2. Total distance probed throughout execution (probe_total)
             3. Length of longest probe chain (probe_max)
             4. Total number of times rehashing is done (rehash_count)
+            5. Number of tombstones currently in the table (tombstones)
+            6. Mean displacement of the items in the table from their home slot, 0 if empty
+            7. Max displacement of the items in the table from their home slot
+            Items still in the previous table of an incremental rehash are left out of 6. and 7.
+            :complexity: O(N) where N is the tablesize
         """
-        return (self.conflict_count, self.probe_total, self.probe_max, self.rehash_count)
+        total = 0
+        longest = 0
+        for position in range(self.tablesize):
+            home = self.slot_hashes[position]
+            if home is not None:
+                displacement = (position - home) % self.tablesize
+                total += displacement
+                longest = max(longest, displacement)
+        mean = total / self.count if self.count else 0
+        return (self.conflict_count, self.probe_total, self.probe_max, self.rehash_count, self.tombstones,
+                mean, longest)
 
     def __len__(self) -> int:
         """
             Returns number of elements in the hash table
             :complexity: O(1)
         """
-        return self.count
+        return self.count + self.old_count
 
-    def _linear_probe(self, key: str, is_insert: bool) -> int:
+    def _linear_probe(self, key: str, is_insert: bool, home: int | None = None) -> int:
         """
-            Find the correct position for this key in the hash table using linear probing
+            Find the correct position for this key in the hash table using linear probing.
+            Tombstones are probed past. An insertion of a key that is not in the table reuses the first tombstone
+            on its probe chain, if any. Keys are only compared in slots whose cached hash matches.
+            :home: the hash of key, if already known
             :complexity best: O(K) first position is empty
                             where K is the size of the key
             :complexity worst: O(K + N) when we've searched the entire table
                             where N is the tablesize
             :raises KeyError: When a position can't be found
         """
-        position = self.hash(key)  # get the position using hash
+        if home is None:
+            home = self.hash(key)
+        position = home  # get the position using hash
         probe_chain = 0
         is_conflicted = False
+        tombstone = -1
+        slot_keys = self.slot_keys
+        slot_hashes = self.slot_hashes
+        tablesize = self.tablesize
 
         if is_insert and self.is_full():
             raise KeyError(key)
 
-        for _ in range(len(self.table)):  # start traversing
-            if self.table[position] is None:  # found empty slot
+        counting = LinearProbeTable.counting
+        for _ in range(tablesize):  # start traversing
+            if counting:
+                LinearProbeTable.slots_probed += 1
+            slot_key = slot_keys[position]
+            if slot_key is None:  # found empty slot
                 if is_insert:
                     if is_conflicted:
                         # Probed at least once, so increment conflict count
                         self.conflict_count += 1
-                    return position
+                    # Reuse the first tombstone passed, the key can't be further along
+                    return position if tombstone == -1 else tombstone
                 else:
                     raise KeyError(key)  # so the key is not in
-            elif self.table[position][0] == key:  # found key
+            elif slot_hashes[position] == home and slot_key == key:  # found key
                 if is_conflicted:
                     # Probed at least once, so increment conflict count
                     self.conflict_count += 1
                 return position
-            else:  # there is something but not the key, try next
+            else:  # there is something (or a tombstone) but not the key, try next
+                if slot_key is TOMBSTONE and tombstone == -1:
+                    tombstone = position
                 # Probe
-                position = (position + 1) % len(self.table)
+                position = (position + 1) % tablesize
                 # Update statistics, conflict here
                 is_conflicted = True
                 self.probe_total += 1
@@ -141,27 +275,210 @@ class LinearProbeTable(Generic[T]):
                 if probe_chain > self.probe_max:
                     self.probe_max = probe_chain
 
+        if is_insert and tombstone != -1:
+            return tombstone
         raise KeyError(key)
 
-    def keys(self) -> list[str]:
+    def _robin_hood_probe(self, key: str) -> int:
         """
-            Returns all keys in the hash table.
+            Find the position of key in a Robin Hood table.
+            The search stops early at an item closer to its home than key would be, as key can't be further along.
+            :complexity best: O(K) first position holds the key or stops the search
+                            where K is the size of the key
+            :complexity worst: O(K + D) where D is the longest displacement in the table
+            :raises KeyError: When the key is not in the table
+        """
+        home = self.hash(key)
+        position = home
+        slot_keys = self.slot_keys
+        slot_hashes = self.slot_hashes
+        tablesize = self.tablesize
+
+        counting = LinearProbeTable.counting
+        for distance in range(tablesize):
+            if counting:
+                LinearProbeTable.slots_probed += 1
+            slot_hash = slot_hashes[position]
+            if slot_hash is None or (position - slot_hash) % tablesize < distance:
+                raise KeyError(key)
+            if slot_hash == home and slot_keys[position] == key:
+                if distance > 0:
+                    # Probed at least once, so increment conflict count
+                    self.conflict_count += 1
+                return position
+            position = (position + 1) % tablesize
+            self.probe_total += 1
+            if distance + 1 > self.probe_max:
+                self.probe_max = distance + 1
+        raise KeyError(key)
+
+    def _robin_hood_insert(self, key: str, data: T, home: int | None = None) -> None:
+        """
+            Set (key, data) in a Robin Hood table.
+            Walking from the home of key, an item closer to its home than the item being placed gives up its slot
+            and is carried on instead, so probe lengths stay close to the mean.
+            :home: the hash of key, if already known
+            :complexity best: O(K) first position is empty or holds the key
+                            where K is the size of the key
+            :complexity worst: O(K + N) where N is the tablesize
+            :raises KeyError: When the table is full and the key is not in it
+        """
+        if self.is_full():
+            self.slot_values[self._robin_hood_probe(key)] = data
+            return
+        if home is None:
+            home = self.hash(key)
+        position = home
+        distance = 0
+        # Once an item is evicted the key is placed, so the items carried after that are never in the table
+        carrying = False
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        slot_hashes = self.slot_hashes
+        tablesize = self.tablesize
+
+        counting = LinearProbeTable.counting
+        for _ in range(tablesize):
+            if counting:
+                LinearProbeTable.slots_probed += 1
+            slot_hash = slot_hashes[position]
+            if slot_hash is None:
+                if distance > 0 and not carrying:
+                    # Probed at least once, so increment conflict count
+                    self.conflict_count += 1
+                slot_keys[position] = key
+                slot_values[position] = data
+                slot_hashes[position] = home
+                self.count += 1
+                return
+            if not carrying and slot_hash == home and slot_keys[position] == key:
+                slot_values[position] = data
+                return
+            displacement = (position - slot_hash) % tablesize
+            if displacement < distance:
+                if not carrying:
+                    self.conflict_count += 1
+                # Take the slot and carry on with the evicted item
+                slot_keys[position], key = key, slot_keys[position]
+                slot_values[position], data = data, slot_values[position]
+                slot_hashes[position], home = home, slot_hash
+                distance = displacement
+                carrying = True
+            position = (position + 1) % tablesize
+            distance += 1
+            self.probe_total += 1
+            if distance > self.probe_max:
+                self.probe_max = distance
+        raise KeyError(key)
+
+    def _robin_hood_delete(self, key: str) -> None:
+        """
+            Delete key from a Robin Hood table, shifting the displaced items after it back by one slot
+            so no tombstone is left behind.
+            :complexity: O(K + D) where K is the size of the key and D the longest displacement in the table
+            :raises KeyError: When the key is not in the table
+        """
+        position = self._robin_hood_probe(key)
+        following = (position + 1) % self.tablesize
+        slot_keys = self.slot_keys
+        slot_values = self.slot_values
+        slot_hashes = self.slot_hashes
+
+        for _ in range(self.tablesize - 1):
+            # Stop at an empty slot or an item already in its home slot
+            slot_hash = slot_hashes[following]
+            if slot_hash is None or slot_hash == following:
+                break
+            slot_keys[position] = slot_keys[following]
+            slot_values[position] = slot_values[following]
+            slot_hashes[position] = slot_hash
+            position = following
+            following = (following + 1) % self.tablesize
+        slot_keys[position] = None
+        slot_values[position] = None
+        slot_hashes[position] = None
+        self.count -= 1
+
+    def _old_position(self, key: str) -> int:
+        """
+            Find the position of key in the previous table while migrating.
+            Migrated and deleted items leave tombstones there, so a plain linear probe is used whatever the mode.
+            :complexity best: O(K) first position holds the key or is empty
+                            where K is the size of the key
+            :complexity worst: O(K + N) where N is the size of the previous table
+            :raises KeyError: When the key is not in the previous table
+        """
+        if self.old_keys is None:
+            raise KeyError(key)
+        tablesize = self.old_tablesize
+        home = self.hash(key, tablesize)
+        position = home
+
+        counting = LinearProbeTable.counting
+        for _ in range(tablesize):
+            if counting:
+                LinearProbeTable.slots_probed += 1
+            slot_key = self.old_keys[position]
+            if slot_key is None:
+                raise KeyError(key)
+            if self.old_hashes[position] == home and slot_key == key:
+                return position
+            position = (position + 1) % tablesize
+        raise KeyError(key)
+
+    def _take_old(self, position: int) -> tuple:
+        """
+            Remove (and return) the (key, data) item at a position of the previous table, leaving a tombstone
+            :complexity: O(1)
+        """
+        item = (self.old_keys[position], self.old_values[position])
+        self.old_keys[position] = TOMBSTONE
+        self.old_values[position] = None
+        self.old_hashes[position] = None
+        self.old_count -= 1
+        return item
+
+    def _migrate(self, steps: int) -> None:
+        """
+            Move the items of the next steps slots of the previous table into the current one,
+            dropping the previous table once every slot is migrated
+            :complexity: O(steps * (K + N)) worst case, where N is the tablesize
+        """
+        end = min(self.migrated + steps, self.old_tablesize)
+        for i in range(self.migrated, end):
+            if self.old_hashes[i] is not None:
+                key, data = self._take_old(i)
+                self._place(key, data)
+        self.migrated = end
+        if self.migrated == self.old_tablesize:
+            self.old_keys = self.old_values = self.old_hashes = None
+
+    def _items(self) -> list[tuple]:
+        """
+            Returns all (key, data) items, including the ones not yet migrated from the previous table
+            :complexity: O(N) where N is the tablesize (plus the size of the previous table while migrating)
         """
         res = []
-        for x in range(len(self.table)):
-            if self.table[x] is not None:
-                res.append(self.table[x][0])
+        for x in range(self.tablesize):
+            if self.slot_hashes[x] is not None:
+                res.append((self.slot_keys[x], self.slot_values[x]))
+        if self.old_keys is not None:
+            for x in range(self.migrated, self.old_tablesize):
+                if self.old_hashes[x] is not None:
+                    res.append((self.old_keys[x], self.old_values[x]))
         return res
 
+    def keys(self) -> list[str]:
+        """
+            Returns all keys in the hash table.
+        """
+        return [key for (key, _) in self._items()]
+
     def values(self) -> list[T]:
         """
             Returns all values in the hash table.
         """
-        res = []
-        for x in range(len(self.table)):
-            if self.table[x] is not None:
-                res.append(self.table[x][1])
-        return res
+        return [data for (_, data) in self._items()]
 
     def __contains__(self, key: str) -> bool:
         """
@@ -181,8 +498,17 @@ class LinearProbeTable(Generic[T]):
             :see: #self._linear_probe(key: str, is_insert: bool)
             :raises KeyError: when the item doesn't exist
         """
-        position = self._linear_probe(key, False)
-        return self.table[position][1]
+        if self.old_keys is not None:
+            self._migrate(self.MIGRATION_STEP)
+        try:
+            if self.robin_hood:
+                position = self._robin_hood_probe(key)
+            else:
+                position = self._linear_probe(key, False)
+        except KeyError:
+            # Not migrated yet, or not there at all
+            return self.old_values[self._old_position(key)]
+        return self.slot_values[position]
 
     def __setitem__(self, key: str, data: T) -> None:
         """
@@ -192,29 +518,114 @@ class LinearProbeTable(Generic[T]):
         """
         # Check if need to rehash before insertion
         load_factor = self.count / self.tablesize
-        if load_factor > 0.5:
+        if load_factor > self.max_load:
             self._rehash()
-        position = self._linear_probe(key, True)
+        elif (self.count + self.tombstones) / self.tablesize > self.max_load:
+            # Mostly tombstones, so clearing them is enough to keep probe chains short
+            self.compact()
+        if self.old_keys is not None:
+            self._migrate(self.MIGRATION_STEP)
+            try:
+                # The key moves to the current table straight away
+                self._take_old(self._old_position(key))
+            except KeyError:
+                pass
+        self._place(key, data)
+
+    def _place(self, key: str, data: T) -> None:
+        """
+            Set (key, data) in the current slots, without checking the load factor
+            :see: #self._linear_probe(key: str, is_insert: bool)
+            :see: #self._robin_hood_insert(key: str, data: T)
+        """
+        if self.robin_hood:
+            self._robin_hood_insert(key, data)
+            return
+        home = self.hash(key)
+        position = self._linear_probe(key, True, home)
 
         # Only increment count when adding to None. If modifying a current (key,value), don't increment count.
-        if self.table[position] is None:
+        slot_key = self.slot_keys[position]
+        if slot_key is None:
             self.count += 1
+        elif slot_key is TOMBSTONE:
+            self.count += 1
+            self.tombstones -= 1
+        else:
+            # The key is already there, only its value changes
+            self.slot_values[position] = data
+            return
 
-        self.table[position] = (key, data)
+        self.slot_keys[position] = key
+        self.slot_values[position] = data
+        self.slot_hashes[position] = home
+
+    def __delitem__(self, key: str) -> None:
+        """
+            Delete the item at a certain key, leaving a tombstone in its slot.
+            The table is compacted in place once tombstones fill more than TOMBSTONE_RATIO of it.
+            Robin Hood tables shift the following items back instead, and never hold tombstones.
+            :see: #self._linear_probe(key: str, is_insert: bool)
+            :raises KeyError: when the item doesn't exist
+            :complexity: O(K + N) worst case (plus O(N) when compacting), where N is the tablesize
+        """
+        if self.old_keys is not None:
+            self._migrate(self.MIGRATION_STEP)
+            try:
+                self._take_old(self._old_position(key))
+                return
+            except KeyError:
+                pass
+        if self.robin_hood:
+            self._robin_hood_delete(key)
+            return
+        position = self._linear_probe(key, False)
+        self.slot_keys[position] = TOMBSTONE
+        self.slot_values[position] = None
+        self.slot_hashes[position] = None
+        self.count -= 1
+        self.tombstones += 1
+        if self.tombstones > self.tablesize * self.TOMBSTONE_RATIO:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+            Reinsert every item into a table of the same size, dropping all tombstones.
+            The cached hashes stay valid, so no key is hashed again. The previous table of an incremental rehash
+            is left as it is.
+            self.count and self.tablesize remain unchanged.
+            :complexity: O(N) where N is the tablesize
+        """
+        prev_keys, prev_values, prev_hashes = self.slot_keys, self.slot_values, self.slot_hashes
+        self.count = 0
+        self.tombstones = 0
+        self._new_slots()
+        for i in range(len(prev_hashes)):
+            home = prev_hashes[i]
+            if home is not None:
+                if self.robin_hood:
+                    self._robin_hood_insert(prev_keys[i], prev_values[i], home)
+                    continue
+                position = self._linear_probe(prev_keys[i], True, home)
+                self.slot_keys[position] = prev_keys[i]
+                self.slot_values[position] = prev_values[i]
+                self.slot_hashes[position] = home
+                self.count += 1
+        self.compaction_count += 1
 
     def is_empty(self):
         """
             Returns whether the hash table is empty
             :complexity: O(1)
         """
-        return self.count == 0
+        return len(self) == 0
 
     def is_full(self):
         """
-            Returns whether the hash table is full
+            Returns whether the current slots of the hash table are full
             :complexity: O(1)
         """
-        return self.count == len(self.table)
+        return self.count == self.tablesize
 
     def insert(self, key: str, data: T) -> None:
         """
@@ -230,21 +641,37 @@ class LinearProbeTable(Generic[T]):
         """
             Need to resize table and reinsert all values.
             Should modify the array -> self.count should remain unchanged.
+            An incremental table keeps the previous slots instead, and later operations migrate them.
+            :complexity: O(N) where N is the tablesize, O(p) for an incremental table
+                         where p is the time taken to generate a prime number for a new table size
         """
+        if self.old_keys is not None:
+            # Still migrating from the rehash before, finish that first
+            self._migrate(self.old_tablesize)
         # Find next prime number that is double
+        prev_tablesize = self.tablesize
         self.tablesize = self.primes.__next__()
-        # Temporarily store previous table and create new_table of roughly double size.
-        prev_table = self.table
-        # Reset count
+        self._set_hash_constants()
+        # Temporarily store previous arrays and create new ones of roughly double size.
+        prev_keys, prev_values, prev_hashes = self.slot_keys, self.slot_values, self.slot_hashes
+        prev_count = self.count
+        # Reset count, the tombstones are left behind
         self.count = 0
-        self.table = ArrayR(self.tablesize)
-        # Updated self.table to be empty.
+        self.tombstones = 0
+        self._new_slots()
+        self.rehash_count += 1
+        if self.incremental:
+            self.old_keys, self.old_values, self.old_hashes = prev_keys, prev_values, prev_hashes
+            self.old_tablesize = prev_tablesize
+            self.old_count = prev_count
+            self.migrated = 0
+            return
+        # Updated the slots to be empty.
         # Have get_item available: NOTE: ArrayR initialized with None objects.
-        for i in range(len(prev_table)):
-            if prev_table[i] is not None:
+        for i in range(len(prev_hashes)):
+            if prev_hashes[i] is not None:
                 # Rehash and reinsert from old table
-                self.insert(prev_table[i][0], prev_table[i][1])
-        self.rehash_count += 1
+                self.insert(prev_keys[i], prev_values[i])
 
     def __str__(self) -> str:
         """
@@ -253,13 +680,10 @@ class LinearProbeTable(Generic[T]):
             :complexity: O(N) where N is the table size
         """
         result = ""
-        for item in self.table:
-            if item is not None:
-                (key, value) = item
-                result += "(" + str(key) + "," + str(value) + ")\n"
+        for (key, value) in self._items():
+            result += "(" + str(key) + "," + str(value) + ")\n"
         return result
 
-
 if __name__ == "__main__":
     s = LinearProbeTable(3, 10)
     print("Initial Size" + f' {s.tablesize}')
@@ -289,6 +713,34 @@ if __name__ == "__main__":
     s['34'] = 'df'
     s['345'] = 'ddff'
     print(s.statistics())
+
+    # Every probing mode and rehash mode, with the hash memo on and off, must behave like a dict
+    # on the same random inserts, updates and deletes
+    from random_gen import RandomGen
+    for robin_hood in (False, True):
+        for incremental in (False, True):
+            for memo in (True, False):
+                LinearProbeTable.set_hash_memo(memo)
+                rng = RandomGen(2022)
+                table = LinearProbeTable(1, robin_hood=robin_hood, incremental=incremental)
+                expected = {}
+                for operation in range(4000):
+                    key = str(rng.randint(0, 300)) * rng.randint(1, 2)
+                    if rng.random_chance(0.6):
+                        table[key] = operation
+                        expected[key] = operation
+                    elif key in expected:
+                        del table[key]
+                        del expected[key]
+                    else:
+                        assert key not in table
+                    assert len(table) == len(expected)
+                assert sorted(zip(table.keys(), table.values())) == sorted(expected.items())
+                for key in expected:
+                    assert table[key] == expected[key]
+                print(f"robin_hood={robin_hood} incremental={incremental} memo={memo}: same as dict, "
+                      f"statistics {table.statistics()}")
+    LinearProbeTable.set_hash_memo(True)
     # print("\n")
     # print(s.hash(" 2"))
     # print(s.hash("a"))
@@ -9,6 +9,10 @@ from material import Material
 
 class MaxHeap(Generic[T]):
     MIN_CAPACITY = 1
+    # Total number of add/get_max/bottom_up calls over every heap while counting, read by PlannerStats
+    operations = 0
+    # Number of enabled PlannerStats, operations are only counted while it is positive
+    counting = 0
 
     def __init__(self, max_size: int) -> None:
         self.length = 0
@@ -38,6 +42,8 @@ class MaxHeap(Generic[T]):
         if self.is_full():
             raise IndexError
 
+        if MaxHeap.counting:
+            MaxHeap.operations += 1
         self.length += 1
         self.the_array[self.length] = element
         self.rise(self.length)
@@ -75,6 +81,8 @@ class MaxHeap(Generic[T]):
         if self.length == 0:
             raise IndexError
 
+        if MaxHeap.counting:
+            MaxHeap.operations += 1
         max_elt = self.the_array[1]
         self.length -= 1
         if self.length > 0:
@@ -91,6 +99,8 @@ class MaxHeap(Generic[T]):
 
         :complexity: O(n) where n is the number of elements in the heap
         """
+        if MaxHeap.counting:
+            MaxHeap.operations += 1
         # Update max size and array
         # max_size == len(lst_items) == length as size required is known
         self.max_size = len(lst_items)
@@ -205,9 +215,180 @@ class MaxHeapTuple(MaxHeap):
         else:
             return 2 * k + 1
 
+class IndexedMaxHeap(MaxHeapTuple):
+    """
+    Modified version of MaxHeapTuple which takes in a Tuple -> (key, handle) and keeps the position of every handle,
+    so the key of an element can be increased or decreased in place. Each handle is in the heap at most once.
+    """
+    def __init__(self, max_size: int):
+        MaxHeapTuple.__init__(self, max_size)
+        self.positions = {}
+
+    def __contains__(self, handle) -> bool:
+        """
+        Returns whether handle is in the heap
+        :complexity: O(1)
+        """
+        return handle in self.positions
+
+    def key(self, handle) -> float:
+        """
+        Returns the key of handle
+        :raises KeyError: if handle is not in the heap
+        :complexity: O(1)
+        """
+        return self.the_array[self.positions[handle]][0]
+
+    def peek(self) -> tuple:
+        """
+        Returns (without removing) the maximum element of the heap
+        :raises IndexError: if the heap is empty
+        :complexity: O(1)
+        """
+        if self.length == 0:
+            raise IndexError
+        return self.the_array[1]
+
+    def rise(self, k: int) -> None:
+        """
+        Rise element at index k to its correct position, keeping the positions of the elements it passes
+        :pre: 1 <= k <= self.length
+        :complexity: O(log n) where n is the number of elems in the heap.
+        """
+        item = self.the_array[k]
+        while k > 1 and item[0] > self.the_array[k // 2][0]:
+            parent = self.the_array[k // 2]
+            self.the_array[k] = parent
+            self.positions[parent[1]] = k
+            k = k // 2
+        self.the_array[k] = item
+        self.positions[item[1]] = k
+
+    def sink(self, k: int) -> None:
+        """
+        Make the element at index k sink to the correct position, keeping the positions of the elements it passes
+        :pre: 1 <= k <= self.length
+        :complexity: worst case O(log n), best case O(1), where n is the number of elems in heap.
+        """
+        item = self.the_array[k]
+
+        while 2 * k <= self.length:
+            max_child = self.largest_child(k)
+            if self.the_array[max_child][0] <= item[0]:
+                break
+            child = self.the_array[max_child]
+            self.the_array[k] = child
+            self.positions[child[1]] = k
+            k = max_child
+
+        self.the_array[k] = item
+        self.positions[item[1]] = k
+
+    def add(self, element: tuple) -> None:
+        """
+        Add a (key, handle) element
+        :raises ValueError: if the handle is already in the heap
+        :raises IndexError: if the heap is full
+        :complexity: O(log n) where n is the number of elems in the heap.
+        """
+        if element[1] in self.positions:
+            raise ValueError("Handle is already in the heap.")
+        MaxHeap.add(self, element)
+
+    def get_max(self) -> tuple:
+        """
+        Remove (and return) the maximum element from the heap
+        :raises IndexError: if the heap is empty
+        :complexity: O(log n) where n is the number of elems in the heap.
+        """
+        max_elt = MaxHeap.get_max(self)
+        del self.positions[max_elt[1]]
+        return max_elt
+
+    def update(self, handle, key: float) -> None:
+        """
+        Change the key of handle, rising or sinking it to its new position
+        :raises KeyError: if handle is not in the heap
+        :complexity: O(log n) where n is the number of elems in the heap.
+        """
+        if MaxHeap.counting:
+            MaxHeap.operations += 1
+        k = self.positions[handle]
+        old_key = self.the_array[k][0]
+        self.the_array[k] = (key, handle)
+        if key > old_key:
+            self.rise(k)
+        else:
+            self.sink(k)
+
+    def remove(self, handle) -> tuple:
+        """
+        Remove (and return) the element of handle, wherever it is in the heap
+        :raises KeyError: if handle is not in the heap
+        :complexity: O(log n) where n is the number of elems in the heap.
+        """
+        if MaxHeap.counting:
+            MaxHeap.operations += 1
+        k = self.positions.pop(handle)
+        removed = self.the_array[k]
+        last = self.the_array[self.length]
+        self.length -= 1
+        if k <= self.length:
+            self.the_array[k] = last
+            if last[0] > removed[0]:
+                self.rise(k)
+            else:
+                self.sink(k)
+        return removed
+
+    def bottom_up(self, lst_items: list):
+        """
+        Bottom up construction of the heap from a list of (key, handle) elements
+
+        :raises ValueError: if a handle is listed twice
+        :complexity: O(n) where n is the number of elements in the heap
+        """
+        self.positions = {}
+        for i in range(len(lst_items)):
+            if lst_items[i][1] in self.positions:
+                raise ValueError("Handle is already in the heap.")
+            self.positions[lst_items[i][1]] = i + 1
+        MaxHeap.bottom_up(self, lst_items)
 
 
 if __name__ == '__main__':
+    # IndexedMaxHeap must agree with a dict of handle -> key on random adds, updates, removes and get_max
+    from random_gen import RandomGen
+    rng = RandomGen(2022)
+    for trial in range(200):
+        heap = IndexedMaxHeap(40)
+        expected = {}
+        for _ in range(100):
+            handle = rng.randint(0, 39)
+            action = rng.randint(0, 3)
+            if action == 0 and handle not in expected:
+                expected[handle] = rng.randint(0, 50)
+                heap.add((expected[handle], handle))
+            elif action == 1 and handle in expected:
+                expected[handle] = rng.randint(0, 50)
+                heap.update(handle, expected[handle])
+            elif action == 2 and handle in expected:
+                assert heap.remove(handle) == (expected.pop(handle), handle)
+            elif action == 3 and expected:
+                key, handle = heap.get_max()
+                assert key == max(expected.values()) and expected.pop(handle) == key
+            assert len(heap) == len(expected)
+            for handle in expected:
+                assert handle in heap and heap.key(handle) == expected[handle]
+                assert heap.the_array[heap.positions[handle]][1] == handle
+        if trial % 2 == 0:
+            heap.bottom_up([(key, handle) for handle, key in expected.items()])
+        keys = []
+        while len(heap) > 0:
+            keys.append(heap.get_max()[0])
+        assert keys == sorted(expected.values(), reverse=True)
+    print("IndexedMaxHeap matches a dict")
+
     items = [ int(x) for x in input('Enter a list of numbers: ').strip().split() ]
     heap = MaxHeap(len(items))
 
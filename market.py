@@ -0,0 +1,184 @@
+from __future__ import annotations
+"""
+
+This file implements the Market class, a live index of the best price offered for each material over all trader deals
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+from hash_table import LinearProbeTable
+from heap import IndexedMaxHeap
+from material import Material
+from trader import Trader
+
+
+class Market:
+    """
+
+    Live index of the best price offered for each material. Every material being bought has an IndexedMaxHeap of
+    (price, trader), so when a trader generates or stops a deal only the heaps of the materials involved are patched,
+    in O(log T). The best prices are kept in a LinearProbeTable read by every planner in O(1) per material,
+    instead of each planner rebuilding the maximum prices from the deals.
+    Traders report their deal changes to the market they are attached to (Trader.market).
+
+    Instance Attributes:
+        materials (list[Material]): The materials of the world
+        traders (list[Trader]): The traders attached to the market
+        heaps (LinearProbeTable): Material name -> IndexedMaxHeap of (price, trader) for the deals on that material
+        prices (LinearProbeTable): Material name -> best price offered for that material, 0 if no trader is buying it
+        listeners (list): Functions called with (material name, price) whenever the best price of a material changes
+        version (int): The number of best price changes so far
+    """
+
+    def __init__(self, materials: list[Material], traders: list[Trader]) -> None:
+        """
+        Build the index over the current deals of traders, and attach every trader to the market.
+
+        Parameters:
+            materials (list[Material]): The materials of the world
+            traders (list[Trader]): The traders whose deals are indexed
+
+        :complexity: O(M + T log T) where M and T are the number of materials and traders
+        """
+        self.materials = []
+        self.traders = []
+        self.heaps = LinearProbeTable(1)
+        self.prices = LinearProbeTable(1)
+        self.listeners = []
+        self.version = 0
+        self.set_materials(materials)
+        self.set_traders(traders)
+
+    def set_materials(self, materials: list[Material]) -> None:
+        """
+        Make sure every material has a best price, materials no trader is buying get a price of 0
+        :complexity: O(M) where M is the number of materials
+        """
+        self.materials = materials
+        for material in materials:
+            if material.name not in self.prices:
+                self.prices[material.name] = 0
+
+    def set_traders(self, traders: list[Trader]) -> None:
+        """
+        Detach the current traders and rebuild the index over the deals of traders, attaching each of them
+        :complexity: O(M + T log T) where M and T are the number of materials and traders
+        """
+        self.detach()
+        self.traders = traders
+        self.heaps = LinearProbeTable(len(self.materials) + len(traders))
+        self.prices = LinearProbeTable(len(self.materials) + len(traders))
+        self.set_materials(self.materials)
+        for trader in traders:
+            trader.market = self
+            if trader.deal:
+                self._heap(trader.deal[0].name).add((trader.deal[1], trader))
+        for mats in self.heaps.keys():
+            self.prices[mats] = self.heaps[mats].peek()[0]
+
+    def detach(self) -> None:
+        """
+        Stop listening to the deals of the current traders
+        :complexity: O(T) where T is the number of traders
+        """
+        for trader in self.traders:
+            if trader.market is self:
+                trader.market = None
+
+    def price(self, material_name: str) -> float:
+        """
+        Returns the best price offered for a material, 0 if no trader is buying it
+        :complexity: O(1)
+        """
+        if material_name in self.prices:
+            return self.prices[material_name]
+        return 0
+
+    def deal_changed(self, trader: Trader, old_deal: tuple[Material, float] | None,
+                     new_deal: tuple[Material, float] | None) -> None:
+        """
+        Patch the heaps of the materials of a trader's old and new deal, called by the trader
+        :complexity: O(log T + L) where T is the number of traders and L the work done by the listeners
+        """
+        if old_deal and old_deal[0].name in self.heaps and trader in self.heaps[old_deal[0].name]:
+            self.heaps[old_deal[0].name].remove(trader)
+            self._refresh(old_deal[0].name)
+        if new_deal:
+            self._heap(new_deal[0].name).add((new_deal[1], trader))
+            self._refresh(new_deal[0].name)
+
+    def _heap(self, material_name: str) -> IndexedMaxHeap:
+        """
+        Returns the heap of deals on a material, creating it or doubling its capacity when it has no room left
+        :complexity: O(1) amortised
+        """
+        if material_name not in self.heaps:
+            self.heaps[material_name] = IndexedMaxHeap(1)
+        heap = self.heaps[material_name]
+        if heap.is_full():
+            # Adding in array order keeps the heap property, so no element rises
+            bigger = IndexedMaxHeap(2 * heap.max_size)
+            for i in range(1, len(heap) + 1):
+                bigger.add(heap.the_array[i])
+            self.heaps[material_name] = heap = bigger
+        return heap
+
+    def _refresh(self, material_name: str) -> None:
+        """
+        Update the best price of a material from its heap, telling the listeners if it changed
+        :complexity: O(1 + L) where L is the work done by the listeners
+        """
+        heap = self.heaps[material_name]
+        price = heap.peek()[0] if len(heap) > 0 else 0
+        if material_name not in self.prices or self.prices[material_name] != price:
+            self.prices[material_name] = price
+            self.version += 1
+            for listener in self.listeners:
+                listener(material_name, price)
+
+
+if __name__ == "__main__":
+    # The live best prices must match the best prices recomputed from the deals after every deal change,
+    # also for a player attached to the world that is not re-shared when the game replaces its traders
+    from monte_carlo import generate_game
+    from game import MultiplayerGame
+    from planner import max_prices
+    from player import Player
+    from world import group_deals
+
+    games = 0
+    changes = 0
+    for seed in range(100):
+        try:
+            game = generate_game(MultiplayerGame, seed)
+        except Exception:
+            continue
+        games += 1
+        rng = game.rng
+        market = game.market
+        notified = {}
+        market.listeners.append(lambda material_name, price: notified.__setitem__(material_name, price))
+        # Attached to the world but not one of the game's players, so never re-shared when the traders are replaced
+        outsider = Player("Outsider")
+        outsider.set_world(game.world)
+        for change in range(60):
+            if change % 20 == 19:
+                for trader in game.traders:
+                    if trader.deal is None:
+                        trader.deal = (game.materials[rng.randint(0, len(game.materials) - 1)], rng.randint(1, 40) / 4)
+                game.set_traders(list(game.traders))
+            trader = game.traders[rng.randint(0, len(game.traders) - 1)]
+            if rng.random_chance(0.2):
+                trader.stop_deal()
+            else:
+                trader.deal = (game.materials[rng.randint(0, len(game.materials) - 1)], rng.randint(1, 40) / 4)
+            changes += 1
+            expected = max_prices(group_deals(game.traders), game.materials)
+            for material in game.materials:
+                assert market.price(material.name) == expected[material.name], (seed, material.name)
+                assert outsider.max_prices()[material.name] == expected[material.name], (seed, material.name)
+                if material.name in notified:
+                    assert notified[material.name] == market.price(material.name)
+    print(f"{changes} deal changes over {games} games: the market matches the recomputed best prices")
@@ -141,18 +141,22 @@ class Material:
         return f"{self.name}: {self.mining_rate}"
 
     @classmethod
-    def random_material(cls):
+    def random_material(cls, rng: RandomGen | None = None):
         """
         
         Class method that returns a random material from the material list
 
+        Parameters:
+            rng (RandomGen | None): The random stream to draw from, defaults to the RandomGen class stream
+
         Returns:
             A Material Object that represents a randomly generated Material Object
         
         :complexity: O(1)
         """
 
-        return Material(RANDOM_MATERIAL_NAMES[RandomGen.randint(0,len(RANDOM_MATERIAL_NAMES)-1)],(RandomGen.random_float())*100)
+        rng = RandomGen if rng is None else rng
+        return Material(RANDOM_MATERIAL_NAMES[rng.randint(0,len(RANDOM_MATERIAL_NAMES)-1)],(rng.random_float())*100)
 
 if __name__ == "__main__":
     
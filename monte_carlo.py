@@ -0,0 +1,217 @@
+from __future__ import annotations
+"""
+
+This file implements a Monte Carlo harness running headless games over many RandomGen seeds in a process pool
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+from game import Game, SoloGame, MultiplayerGame
+from random_gen import RandomGen
+
+
+class Summary:
+    """
+
+    Running summary statistics of the final player balances over many seeds.
+    Summaries of disjoint seed chunks are merged in the parent, so workers only send back a few numbers.
+
+    Instance Attributes:
+        runs (int): Number of seeds that ran to the end
+        failed (int): Number of seeds whose game could not be generated
+        balances (int): Number of final balances seen (one per player per seed)
+        total (float): Sum of the final balances
+        total_squares (float): Sum of the squared final balances
+        minimum (float): Smallest final balance
+        maximum (float): Largest final balance
+    """
+
+    def __init__(self) -> None:
+        """
+        Creates an empty summary
+        :complexity: O(1)
+        """
+        self.runs = 0
+        self.failed = 0
+        self.balances = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, balances: list[float]) -> None:
+        """
+        Add the final balances of one seed
+        :complexity: O(P) where P is the number of players
+        """
+        self.runs += 1
+        for balance in balances:
+            self.balances += 1
+            self.total += balance
+            self.total_squares += balance * balance
+            self.minimum = min(self.minimum, balance)
+            self.maximum = max(self.maximum, balance)
+
+    def merge(self, other: Summary) -> None:
+        """
+        Add every seed summarised by other
+        :complexity: O(1)
+        """
+        self.runs += other.runs
+        self.failed += other.failed
+        self.balances += other.balances
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def mean(self) -> float:
+        """
+        Returns the mean final balance, 0 if no balance was seen
+        :complexity: O(1)
+        """
+        if self.balances == 0:
+            return 0
+        return self.total / self.balances
+
+    def std(self) -> float:
+        """
+        Returns the (population) standard deviation of the final balances
+        :complexity: O(1)
+        """
+        if self.balances == 0:
+            return 0
+        mean = self.mean()
+        return math.sqrt(max(0.0, self.total_squares / self.balances - mean * mean))
+
+    def __str__(self) -> str:
+        return (f"{self.runs} runs ({self.failed} failed), {self.balances} balances: "
+                f"mean {self.mean()}, std {self.std()}, min {self.minimum}, max {self.maximum}")
+
+
+def generate_game(game_class: type[Game], seed: int) -> Game:
+    """
+    Generate a headless game from seed. The game draws from its own RandomGen stream,
+    so seeds can also be run side by side in threads.
+
+    Parameters:
+        game_class (type[Game]): SoloGame or MultiplayerGame
+        seed (int): The RandomGen seed the game is generated and simulated from
+
+    Returns:
+        The initialised game
+
+    :complexity: O(G) where G is the cost of generating the game
+    """
+    game = game_class(RandomGen(seed))
+    game.verbose = False
+    game.initialise_game()
+    return game
+
+
+def play_game(game: Game, days: int, setup: Callable[[Game], None] | None = None) -> list[float]:
+    """
+    Run an initialised game headless for a number of days
+
+    Returns:
+        The final balance of every player
+
+    :complexity: O(days * D) where D is the cost of simulating one day
+    """
+    if setup is not None:
+        setup(game)
+    game.run(days)
+    return [player.balance for player in game.get_players()]
+
+
+def run_seed(game_class: type[Game], seed: int, days: int, setup: Callable[[Game], None] | None = None) -> list[float]:
+    """
+    Generate a game from seed and run it headless for a number of days.
+    :see: generate_game, play_game
+
+    Parameters:
+        game_class (type[Game]): SoloGame or MultiplayerGame
+        seed (int): The RandomGen seed the game is generated and simulated from
+        days (int): The number of days to simulate
+        setup (Callable[[Game], None] | None): Called with the initialised game before the first day, e.g. to pick a
+                                               planner. Must be a module level function so it can be sent to workers.
+
+    Returns:
+        The final balance of every player
+
+    :complexity: O(G + days * D) where G is the cost of generating the game and D of simulating one day
+    """
+    return play_game(generate_game(game_class, seed), days, setup)
+
+
+def run_chunk(game_class: type[Game], seeds: list[int], days: int, setup: Callable[[Game], None] | None = None) -> Summary:
+    """
+    Run one seed after the other in this process and summarise the final balances.
+    Seeds whose random game cannot be generated are counted as failed, errors while simulating are raised.
+
+    :complexity: O(S * (G + days * D)) where S is the number of seeds
+    """
+    summary = Summary()
+    for seed in seeds:
+        try:
+            game = generate_game(game_class, seed)
+        except Exception:
+            summary.failed += 1
+            continue
+        summary.add(play_game(game, days, setup))
+    return summary
+
+
+def monte_carlo(game_class: type[Game], seeds: range | list[int], days: int, setup: Callable[[Game], None] | None = None,
+                workers: int | None = None, chunk_size: int | None = None) -> Summary:
+    """
+    Run a headless game for every seed, spreading chunks of seeds over a ProcessPoolExecutor.
+    Every game draws from its own RandomGen stream seeded with its seed,
+    so each seed gives the same game however the seeds are spread over the workers. Chunk summaries are merged in the parent
+    in seed order, so for a given chunk_size the result is the same (to the last digit) whatever the number of workers.
+
+    Parameters:
+        game_class (type[Game]): SoloGame or MultiplayerGame
+        seeds (range | list[int]): The seeds to run
+        days (int): The number of days to simulate per seed
+        setup (Callable[[Game], None] | None): Called with each initialised game, must be a module level function
+        workers (int | None): The number of worker processes, defaults to the number of CPUs. 1 runs in this process.
+        chunk_size (int | None): The number of seeds per task, defaults to about 4 tasks per worker
+
+    Returns:
+        The Summary of the final balances over every seed
+
+    :complexity: O(S * (G + days * D) / W) wall time for S seeds over W workers
+    """
+    seeds = list(seeds)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(seeds) / (4 * workers)))
+    summary = Summary()
+    if workers <= 1:
+        for i in range(0, len(seeds), chunk_size):
+            summary.merge(run_chunk(game_class, seeds[i:i + chunk_size], days, setup))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_chunk, game_class, seeds[i:i + chunk_size], days, setup)
+                   for i in range(0, len(seeds), chunk_size)]
+        for future in futures:
+            summary.merge(future.result())
+    return summary
+
+
+if __name__ == "__main__":
+    for game_class in (SoloGame, MultiplayerGame):
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            summary = monte_carlo(game_class, range(200), 30, workers=workers)
+            print(f"{game_class.__name__} with {workers} workers in {time.perf_counter() - start:.2f}s: {summary}")
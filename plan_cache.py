@@ -0,0 +1,174 @@
+from __future__ import annotations
+"""
+
+This file implements the PlanCache class, a bounded LRU memo of plans for Player.select_food_and_caves
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+from collections import OrderedDict
+from hash_table import LinearProbeTable
+from cave import Cave
+from food import Food
+
+FINGERPRINT_MASK = (1 << 64) - 1
+
+
+class PlanCache:
+    """
+
+    Bounded memo of plans keyed by a fingerprint of everything a plan depends on:
+    the best price of each material, the cave quantities, the food menu, the balance and the planner.
+    The price and cave parts of the fingerprint are maintained incrementally, so a lookup costs O(F) for the menu.
+    Both are order independent sums, so the same prices and quantities always give the same fingerprint however they
+    were reached. Cave quantities and best prices are tracked through update_cave and update_price, so every change must
+    be reported (the games do this through Game.notify_cave_changed and Game.notify_price_changed).
+    When full, the least recently used plan is evicted.
+
+    Instance Attributes:
+        capacity (int): The maximum number of plans kept
+        plans (OrderedDict): Fingerprint -> plan, from least to most recently used
+        caves (LinearProbeTable | None): The caves table the cave fingerprint was built from
+        seen (dict[Cave, float]): The quantity of each cave when it was last seen by the cache
+        cave_fingerprint (int): Order independent sum of the (cave, quantity) hashes
+        prices (dict[str, float]): The best price of each material when it was last seen by the cache
+        deal_fingerprint (int): Order independent sum of the (material name, best price) hashes
+        hits (int): Number of lookups answered from the cache
+        misses (int): Number of lookups that had to be planned
+        evictions (int): Number of plans evicted to make room
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Creates an empty cache holding at most capacity plans
+        :raises ValueError: if capacity is not positive
+        :complexity: O(1)
+        """
+        if capacity <= 0:
+            raise ValueError("Plan cache capacity should be larger than 0.")
+        self.capacity = capacity
+        self.plans = OrderedDict()
+        self.caves = None
+        self.seen = {}
+        self.cave_fingerprint = 0
+        self.prices = {}
+        self.deal_fingerprint = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """
+        Returns the number of plans cached
+        :complexity: O(1)
+        """
+        return len(self.plans)
+
+    def statistics(self) -> tuple:
+        """
+        Returns a tuple of 4 values:
+        1. Number of lookups answered from the cache (hits)
+        2. Number of lookups that had to be planned (misses)
+        3. Number of plans evicted to make room (evictions)
+        4. Number of plans currently cached
+        """
+        return (self.hits, self.misses, self.evictions, len(self.plans))
+
+    def track_prices(self, prices: LinearProbeTable) -> None:
+        """
+        Fingerprint a best price table (material name -> best price over the trader deals)
+        :complexity: O(M) where M is the number of materials
+        """
+        self.prices = {}
+        self.deal_fingerprint = 0
+        for mats in prices.keys():
+            self.prices[mats] = prices[mats]
+            self.deal_fingerprint = (self.deal_fingerprint + self._price_hash(mats, prices[mats])) & FINGERPRINT_MASK
+
+    def track_caves(self, caves: LinearProbeTable) -> None:
+        """
+        Fingerprint the quantities of a caves table (material name -> list of caves).
+        Plans refer to cave objects, so moving to a different table drops every cached plan.
+        :complexity: O(C) where C is the number of caves
+        """
+        if caves is not self.caves:
+            self.plans.clear()
+        self.caves = caves
+        self.seen = {}
+        self.cave_fingerprint = 0
+        for mats in caves.keys():
+            for cave in caves[mats]:
+                self.seen[cave] = cave.quantity
+                self.cave_fingerprint = (self.cave_fingerprint + self._cave_hash(cave, cave.quantity)) & FINGERPRINT_MASK
+
+    def update_cave(self, cave: Cave) -> None:
+        """
+        Patch the cave fingerprint after the quantity of a cave has changed. Unknown caves are ignored.
+        :complexity: O(1)
+        """
+        if cave in self.seen and self.seen[cave] != cave.quantity:
+            fingerprint = self.cave_fingerprint - self._cave_hash(cave, self.seen[cave])
+            self.cave_fingerprint = (fingerprint + self._cave_hash(cave, cave.quantity)) & FINGERPRINT_MASK
+            self.seen[cave] = cave.quantity
+
+    def update_price(self, material_name: str, price: float) -> None:
+        """
+        Patch the deal fingerprint after the best price of a material has changed
+        :complexity: O(1)
+        """
+        fingerprint = self.deal_fingerprint - self._price_hash(material_name, self.prices.get(material_name, 0))
+        self.deal_fingerprint = (fingerprint + self._price_hash(material_name, price)) & FINGERPRINT_MASK
+        self.prices[material_name] = price
+
+    def key(self, planner: str, foods: list[Food], balance: float) -> tuple:
+        """
+        Returns the fingerprint of a planning call
+        :complexity: O(F) where F is the number of foods
+        """
+        menu = tuple((food.name, food.hunger_bars, food.price) for food in foods)
+        return (planner, balance, self.deal_fingerprint, self.cave_fingerprint, menu)
+
+    def get(self, key: tuple) -> tuple | None:
+        """
+        Returns the plan cached for key (marking it most recently used), or None
+        :complexity: O(1)
+        """
+        plan = self.plans.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.plans.move_to_end(key)
+        return plan
+
+    def put(self, key: tuple, plan: tuple) -> None:
+        """
+        Cache a plan, evicting the least recently used plan if the cache is full
+        :complexity: O(1)
+        """
+        self.plans[key] = plan
+        self.plans.move_to_end(key)
+        if len(self.plans) > self.capacity:
+            self.plans.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _price_hash(material_name: str, price: float) -> int:
+        """
+        Hash of one material selling at a best price. A price of 0 (nobody buying) hashes to 0,
+        so it fingerprints the same as a material missing from the table.
+        :complexity: O(1)
+        """
+        if price == 0:
+            return 0
+        return hash((material_name, price)) & FINGERPRINT_MASK
+
+    @staticmethod
+    def _cave_hash(cave: Cave, quantity: float) -> int:
+        """
+        Hash of one cave holding a quantity
+        :complexity: O(1)
+        """
+        return hash((id(cave), quantity)) & FINGERPRINT_MASK
@@ -0,0 +1,731 @@
+from __future__ import annotations
+"""
+
+This file implements the planning engines used by Player.select_food_and_caves
+
+Efficiency (max price / mining rate) is a property of the material, not the cave, so every planner here works on
+one bucket per material holding the total quantity of its caves. The greedy choice runs over at most M buckets and
+the buckets are only expanded back into individual caves to produce the list of caves plundered.
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+from bisect import bisect_left
+from hash_table import LinearProbeTable
+from heap import MaxHeapTuple
+from fenwick import FenwickTree
+from material import Material
+from cave import Cave
+from food import Food
+from constants import EPSILON
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python planners are used without it
+    np = None
+
+
+def max_prices(traders: LinearProbeTable, materials: list[Material]) -> LinearProbeTable:
+    """
+    Find the maximum selling price of every material over all trader deals.
+    Materials no trader is buying get a price of 0.
+    For example: If traders = [(trader1: ("Prismarine", 10)), (trader2: ("Gold", 5))]
+                    materials = [(Prismarine, 11), (Gold,3), (Iron,22)]
+                Max price hash table will look like [("Prismarine", 10), ("Gold", 5), ("Iron", 0)]
+
+    Parameters:
+        traders (LinearProbeTable): Material name -> list of deal prices for that material
+        materials (list[Material]): The materials of the world
+
+    :complexity: O(M + T), where M = number of materials, T = number of traders
+    """
+    prices = LinearProbeTable(max(1, len(traders)))
+    # Finding max prices O(T + M)
+    # Iterate through all materials sold by traders, add the maximum price for each material into prices.
+    for mats in traders.keys():
+        for deal in traders[mats]:
+            # In hashtable so add if it is larger
+            try:
+                if prices[mats] < deal - EPSILON:
+                    prices[mats] = deal
+            # Not in hashtable so just insert it
+            except KeyError:
+                prices[mats] = deal
+
+    # If not selling material, add into max price as 0
+    for material in materials:
+        try:
+            if prices[material.name]:
+                pass
+        except KeyError:
+            prices[material.name] = 0
+    return prices
+
+
+def material_buckets(caves: LinearProbeTable, best_prices: LinearProbeTable) -> tuple[list[list[Cave]], list[float], list[float], list[float]]:
+    """
+    Collapse the caves into one bucket per material.
+    Caves sharing a material are interchangeable for the greedy choice, so only their total quantity matters.
+
+    Parameters:
+        caves (LinearProbeTable): Material name -> list of caves holding that material
+        best_prices (LinearProbeTable): Material name -> best selling price for that material
+
+    Returns:
+        The caves, mining rate, best selling price and total quantity of every bucket
+
+    :complexity: O(C) where C is the number of caves
+    """
+    buckets = []
+    rates = []
+    prices = []
+    quantities = []
+    for mats in caves.keys():
+        bucket = caves[mats]
+        total = 0
+        for cave in bucket:
+            total += cave.quantity
+        buckets.append(bucket)
+        rates.append(bucket[0].material.mining_rate)
+        prices.append(best_prices[mats])
+        quantities.append(total)
+    return buckets, rates, prices, quantities
+
+
+def rank_buckets(rates: list[float], prices: list[float]) -> list[int]:
+    """
+    Order the buckets from most to least efficient (max price / mining rate) using a bottom up max heap.
+    :return: the bucket indices in ranked order
+    :complexity: O(M log M) where M is the number of buckets
+    """
+    efficiency_array = []
+    for i in range(len(rates)):
+        efficiency_array.append((prices[i] / rates[i], i))
+    bucket_efficiency = MaxHeapTuple(len(efficiency_array))
+    bucket_efficiency.bottom_up(efficiency_array)
+    ranked = []
+    # Drain the heap once, O(M log M)
+    while len(bucket_efficiency) > 0:
+        ranked.append(bucket_efficiency.get_max()[1])
+    return ranked
+
+
+def expand_plunder(buckets: list[list[Cave]], full: int, partial_quantity: float) -> list[tuple[Cave, float]]:
+    """
+    Expand mined buckets back into individual caves.
+    The first full ranked buckets are mined completely, then partial_quantity is mined from the next bucket,
+    taking its caves in order.
+
+    :complexity: O(K) where K is the number of caves plundered
+    """
+    caves_plundered = []
+    for i in range(full):
+        for cave in buckets[i]:
+            caves_plundered.append((cave, cave.quantity))
+    if full < len(buckets):
+        left = partial_quantity
+        for cave in buckets[full]:
+            if left <= EPSILON:
+                break
+            quantity_mined = min(cave.quantity, left)
+            caves_plundered.append((cave, quantity_mined))
+            left -= quantity_mined
+    return caves_plundered
+
+
+def frontier_foods(foods: list[Food], balance: float) -> list[Food]:
+    """
+    Prune the foods that can never be chosen, keeping the Pareto frontier of affordable foods.
+    A food is dominated when another food costs no more and gives at least as many hunger bars, since the emeralds
+    mined never decrease with more hunger. Foods are taken cheapest first (most hunger first on equal price, first listed
+    first on identical offers) from a bottom up max heap, and kept only if they beat the running max of hunger bars,
+    so of identical offers the first listed one is kept, as a scan in menu order would. Unaffordable foods are dropped.
+
+    Parameters:
+        foods (list[Food]): The foods on offer
+        balance (float): The emeralds available to buy food
+
+    Returns:
+        The frontier foods, from cheapest to most expensive
+
+    :complexity: O(F log F) where F is the number of foods
+    """
+    food_array = []
+    for i in range(len(foods)):
+        food = foods[i]
+        if food.price < balance - EPSILON:
+            food_array.append(((-food.price, food.hunger_bars, -i), food))
+    food_heap = MaxHeapTuple(len(food_array))
+    food_heap.bottom_up(food_array)
+    frontier = []
+    max_hunger = None
+    while len(food_heap) > 0:
+        food = food_heap.get_max()[1]
+        if max_hunger is None or food.hunger_bars > max_hunger:
+            frontier.append(food)
+            max_hunger = food.hunger_bars
+    return frontier
+
+
+class EfficiencyRanking:
+    """
+
+    Material buckets ranked once by efficiency (emeralds earned per hunger bar spent), with cumulative hunger and
+    emerald arrays. Efficiency does not depend on the food, so a single ranking answers every food offered on a day.
+
+    Instance Attributes:
+        buckets (list[list[Cave]]): The caves of each material, ordered from most to least efficient material
+        rates (list[float]): The mining rate of each ranked material
+        prices (list[float]): The best selling price of each ranked material
+        quantities (list[float]): The total cave quantity of each ranked material
+        hunger_prefix (list[float]): hunger_prefix[i] is the hunger needed to fully mine the first i ranked buckets
+        emerald_prefix (list[float]): emerald_prefix[i] is the emeralds earned by fully mining the first i ranked buckets
+    """
+
+    def __init__(self, caves: LinearProbeTable, best_prices: LinearProbeTable) -> None:
+        """
+        Collapse the caves into material buckets, rank them by efficiency, then build the prefix arrays.
+
+        Parameters:
+            caves (LinearProbeTable): Material name -> list of caves holding that material
+            best_prices (LinearProbeTable): Material name -> best selling price for that material
+
+        :complexity: O(C + M log M) where C is the number of caves and M is the number of materials
+        """
+        buckets, rates, prices, quantities = material_buckets(caves, best_prices)
+        order = rank_buckets(rates, prices)
+        self.buckets = [buckets[i] for i in order]
+        self.rates = [rates[i] for i in order]
+        self.prices = [prices[i] for i in order]
+        self.quantities = [quantities[i] for i in order]
+        self.hunger_prefix = [0]
+        self.emerald_prefix = [0]
+        for i in range(len(order)):
+            self.hunger_prefix.append(self.hunger_prefix[-1] + self.rates[i] * self.quantities[i])
+            self.emerald_prefix.append(self.emerald_prefix[-1] + self.prices[i] * self.quantities[i])
+
+    def __len__(self) -> int:
+        """
+        Returns the number of ranked buckets
+        :complexity: O(1)
+        """
+        return len(self.buckets)
+
+    def mine(self, hunger: float) -> tuple[float, int, float]:
+        """
+        Greedily spend hunger on the ranked buckets.
+        Binary search for the last bucket that can be fully mined, then take one fractional step into the next bucket.
+
+        Parameters:
+            hunger (float): The hunger bars available for mining
+
+        Returns:
+            The emeralds earned, the number of fully mined buckets, and the ratio mined of the next bucket (0 if none)
+
+        :complexity: O(log M) where M is the number of buckets
+        """
+        # hunger_prefix[full] < hunger <= hunger_prefix[full + 1], clamped at 0 for foods without hunger
+        full = max(bisect_left(self.hunger_prefix, hunger) - 1, 0)
+        if full >= len(self.buckets):
+            return self.emerald_prefix[-1], len(self.buckets), 0
+        emeralds = self.emerald_prefix[full]
+        remaining = hunger - self.hunger_prefix[full]
+        if remaining <= EPSILON:
+            return emeralds, full, 0
+        ratio = remaining / (self.hunger_prefix[full + 1] - self.hunger_prefix[full])
+        return emeralds + ratio * (self.emerald_prefix[full + 1] - self.emerald_prefix[full]), full, ratio
+
+    def plunder(self, hunger: float) -> list[tuple[Cave, float]]:
+        """
+        Returns the caves mined with the given hunger, and the quantity mined from each
+
+        :complexity: O(log M + K) where K is the number of caves plundered
+        """
+        _, full, ratio = self.mine(hunger)
+        partial_quantity = ratio * self.quantities[full] if ratio else 0
+        return expand_plunder(self.buckets, full, partial_quantity)
+
+    def select(self, foods: list[Food], balance: float) -> tuple[Food | None, float, list[tuple[Cave, float]]]:
+        """
+        Find the affordable food with the largest emerald gain (after paying for the food).
+
+        Parameters:
+            foods (list[Food]): The foods on offer
+            balance (float): The emeralds available to buy food
+
+        Returns:
+            The food purchased (None if no food is profitable), the emeralds gained and the caves plundered
+
+        :complexity: O(F log M + K) where F is the number of foods and K is the number of caves plundered
+        """
+        max_emeralds = 0
+        max_food = None
+        for food in foods:
+            if food.price < balance - EPSILON:
+                cur_emeralds = self.mine(food.hunger_bars)[0] - food.price
+                if cur_emeralds > max_emeralds + EPSILON:
+                    max_emeralds = cur_emeralds
+                    max_food = food
+        if max_food is None:
+            return None, 0, []
+        return max_food, max_emeralds, self.plunder(max_food.hunger_bars)
+
+    def select_batch(self, foods: list[Food], balances: list[float]) -> list[tuple[Food | None, float, list[tuple[Cave, float]]]]:
+        """
+        Answer select for many independent players sharing this ranking, each with its own balance.
+        Only the affordability cut-off differs between players: the affordable foods of any balance are a prefix of
+        the price ordered frontier, so each food is evaluated once, a running best over the frontier is kept, and each
+        player is answered with a binary search on price. Each chosen food's plan is only expanded once.
+
+        Parameters:
+            foods (list[Food]): The foods on offer, shared by every player
+            balances (list[float]): The emeralds available to each player
+
+        Returns:
+            For each balance (in order), the food purchased, the emeralds gained and the caves plundered
+
+        :complexity: O(F log F + F log M + P log F + K) where F is the number of foods, M the number of buckets,
+                     P the number of balances and K the number of caves in the distinct plans
+        """
+        frontier = frontier_foods(foods, float("inf"))
+        prices = []
+        # best[k] is the index of the best food among the k cheapest frontier foods (None if none are profitable)
+        best = [None]
+        best_emeralds = [0]
+        for i in range(len(frontier)):
+            cur_emeralds = self.mine(frontier[i].hunger_bars)[0] - frontier[i].price
+            prices.append(frontier[i].price)
+            if cur_emeralds > best_emeralds[-1] + EPSILON:
+                best.append(i)
+                best_emeralds.append(cur_emeralds)
+            else:
+                best.append(best[-1])
+                best_emeralds.append(best_emeralds[-1])
+
+        plans = {}
+        results = []
+        for balance in balances:
+            # Foods are affordable when price < balance - EPSILON
+            affordable = bisect_left(prices, balance - EPSILON)
+            index = best[affordable]
+            if index is None:
+                results.append((None, 0, []))
+                continue
+            if index not in plans:
+                plans[index] = self.plunder(frontier[index].hunger_bars)
+            results.append((frontier[index], best_emeralds[affordable], list(plans[index])))
+        return results
+
+
+class EfficiencyIndex(EfficiencyRanking):
+    """
+
+    Persistent EfficiencyRanking kept alive across days, patched as trader prices and cave quantities change.
+    Hunger and emeralds are held in Fenwick trees over the ranked buckets, so a cave quantity update costs O(log M)
+    and a day with no price changes needs no setup before planning.
+    The ranking is only rebuilt when a material's best price changes or caves are added or removed.
+    Quantities changed directly on a cave, without update_quantity, are picked up by an O(C) check before each plan.
+
+    Instance Attributes:
+        buckets (list[list[Cave]]): The caves of each material, ordered from most to least efficient material
+        rates (list[float]): The mining rate of each ranked material
+        prices (list[float]): The best selling price of each ranked material
+        quantities (list[float]): The total cave quantity of each ranked material
+        positions (LinearProbeTable | None): Material name -> ranked position of its bucket
+        seen (dict[Cave, float]): The quantity of each cave when it was last seen by the index
+        max_prices (LinearProbeTable | None): Material name -> best selling price for that material
+        cave_table (LinearProbeTable | None): Material name -> list of caves holding that material
+        hunger_tree (FenwickTree): Hunger needed to fully mine each ranked bucket
+        emerald_tree (FenwickTree): Emeralds earned by fully mining each ranked bucket
+        stale (bool): Whether the ranking must be rebuilt before the next plan
+    """
+
+    def __init__(self) -> None:
+        """
+        Creates an empty index, which is built on first use once prices and caves are set.
+        :complexity: O(1)
+        """
+        self.buckets = []
+        self.rates = []
+        self.prices = []
+        self.quantities = []
+        self.positions = None
+        self.seen = {}
+        self.max_prices = None
+        self.cave_table = None
+        self.hunger_tree = FenwickTree([])
+        self.emerald_tree = FenwickTree([])
+        self.stale = True
+
+    def set_prices(self, best_prices: LinearProbeTable) -> None:
+        """
+        Patch in the day's best selling prices. The ranking is only marked stale if some price actually changed.
+        :complexity: O(M) where M is the number of materials
+        """
+        if not self.stale:
+            for mats in best_prices.keys():
+                if mats not in self.max_prices or abs(self.max_prices[mats] - best_prices[mats]) > EPSILON:
+                    self.stale = True
+                    break
+        self.max_prices = best_prices
+
+    def update_price(self, material_name: str, price: float) -> None:
+        """
+        Mark the ranking stale if the best price of a ranked material has changed
+        :complexity: O(1)
+        """
+        if self.stale or material_name not in self.positions:
+            return
+        if abs(self.prices[self.positions[material_name]] - price) > EPSILON:
+            self.stale = True
+
+    def set_caves(self, caves: LinearProbeTable) -> None:
+        """
+        Patch in a new set of caves. Known caves only have their quantities updated,
+        any added or removed cave marks the ranking stale.
+        :complexity: O(C log M) where C is the number of caves and M is the number of materials
+        """
+        self.cave_table = caves
+        if self.stale:
+            return
+        count = 0
+        for mats in caves.keys():
+            for cave in caves[mats]:
+                if cave not in self.seen:
+                    self.stale = True
+                    return
+                self.update_quantity(cave)
+                count += 1
+        if count != len(self.seen):
+            self.stale = True
+
+    def sync_quantities(self) -> None:
+        """
+        Patch in the quantity of every cave that changed without update_quantity being called,
+        e.g. set directly on the cave between days, so plans never use stale totals.
+        :complexity: O(C + K log M) where C is the number of caves, K the number of changed caves
+                     and M the number of materials
+        """
+        if self.stale:
+            return
+        for cave in self.seen:
+            if cave.quantity != self.seen[cave]:
+                self.update_quantity(cave)
+
+    def update_quantity(self, cave: Cave) -> None:
+        """
+        Patch the bucket totals and Fenwick trees after the quantity of a cave has changed.
+        Caves the index does not know about are ignored.
+        :complexity: O(log M) where M is the number of materials
+        """
+        if self.stale or cave not in self.seen:
+            return
+        delta = cave.quantity - self.seen[cave]
+        if delta:
+            self.seen[cave] = cave.quantity
+            position = self.positions[cave.material.name]
+            self.quantities[position] += delta
+            self.hunger_tree.add(position, delta * self.rates[position])
+            self.emerald_tree.add(position, delta * self.prices[position])
+
+    def _rebuild(self) -> None:
+        """
+        Re-bucket and re-rank every cave, then rebuild the Fenwick trees.
+        :complexity: O(C + M log M) where C is the number of caves and M is the number of materials
+        """
+        buckets, rates, prices, quantities = material_buckets(self.cave_table, self.max_prices)
+        order = rank_buckets(rates, prices)
+        self.buckets = [buckets[i] for i in order]
+        self.rates = [rates[i] for i in order]
+        self.prices = [prices[i] for i in order]
+        self.quantities = [quantities[i] for i in order]
+        self.positions = LinearProbeTable(len(order))
+        self.seen = {}
+        for i in range(len(order)):
+            self.positions[self.buckets[i][0].material.name] = i
+            for cave in self.buckets[i]:
+                self.seen[cave] = cave.quantity
+        self.hunger_tree = FenwickTree([self.rates[i] * self.quantities[i] for i in range(len(order))])
+        self.emerald_tree = FenwickTree([self.prices[i] * self.quantities[i] for i in range(len(order))])
+        self.stale = False
+
+    def select(self, foods: list[Food], balance: float) -> tuple[Food | None, float, list[tuple[Cave, float]]]:
+        """
+        Check the tracked cave quantities against the live ones, then find the best food as EfficiencyRanking does.
+        :see: EfficiencyRanking.select
+        :complexity: O(C + F log M + K) where C is the number of caves, F the number of foods, M the number of
+                     materials and K the number of caves plundered
+        """
+        self.sync_quantities()
+        return super().select(foods, balance)
+
+    def mine(self, hunger: float) -> tuple[float, int, float]:
+        """
+        Greedily spend hunger on the ranked buckets, rebuilding the ranking first if it is stale.
+        :see: EfficiencyRanking.mine
+        :complexity: O(log M) where M is the number of buckets, O(C + M log M) if the ranking is stale
+        """
+        if self.stale:
+            self._rebuild()
+        full, spent = self.hunger_tree.search(hunger)
+        emeralds = self.emerald_tree.prefix(full)
+        remaining = hunger - spent
+        if full >= len(self.buckets) or remaining <= EPSILON:
+            return emeralds, full, 0
+        cost = self.rates[full] * self.quantities[full]
+        if cost <= EPSILON:
+            return emeralds, full, 0
+        ratio = min(1, remaining / cost)
+        return emeralds + ratio * self.prices[full] * self.quantities[full], full, ratio
+
+
+def select_vectorized(caves: LinearProbeTable, best_prices: LinearProbeTable, foods: list[Food],
+                      balance: float) -> tuple[Food | None, float, list[tuple[Cave, float]]]:
+    """
+    Array-backed equivalent of EfficiencyRanking.select, evaluating every food in one pass with NumPy.
+    Material buckets are loaded into contiguous arrays of mining rate, quantity and max price, and foods into arrays
+    of hunger bars and price. The ranking is a single argsort, the prefix sums are cumsums, and every food is
+    answered at once with searchsorted, with argmax picking the best food.
+
+    Parameters:
+        caves (LinearProbeTable): Material name -> list of caves holding that material
+        best_prices (LinearProbeTable): Material name -> best selling price for that material
+        foods (list[Food]): The foods on offer
+        balance (float): The emeralds available to buy food
+
+    Returns:
+        The food purchased (None if no food is profitable), the emeralds gained and the caves plundered
+
+    :pre: NumPy is installed (np is not None)
+    :complexity: O(C + M log M + F log M) where C is the number of caves, M the number of materials
+                 and F the number of foods
+    """
+    buckets, rates, prices, quantities = material_buckets(caves, best_prices)
+    if not buckets or not foods:
+        return None, 0, []
+    rates = np.array(rates, dtype=float)
+    quantities = np.array(quantities, dtype=float)
+    prices = np.array(prices, dtype=float)
+
+    # Rank buckets by efficiency (stable, so equal efficiencies keep table order) and build the prefix sums
+    order = np.argsort(-(prices / rates), kind="stable")
+    hunger_prefix = np.concatenate(([0.0], np.cumsum((rates * quantities)[order])))
+    emerald_prefix = np.concatenate(([0.0], np.cumsum((prices * quantities)[order])))
+
+    hunger = np.array([food.hunger_bars for food in foods], dtype=float)
+    food_prices = np.array([food.price for food in foods], dtype=float)
+
+    # hunger_prefix[full] < hunger <= hunger_prefix[full + 1], clamped at 0 for foods without hunger
+    # and capped at the number of buckets
+    n_buckets = len(buckets)
+    full = np.minimum(np.maximum(np.searchsorted(hunger_prefix, hunger, side="left") - 1, 0), n_buckets)
+    remaining = hunger - hunger_prefix[full]
+    partial = (full < n_buckets) & (remaining > EPSILON)
+    step = np.minimum(full, n_buckets - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(partial, remaining / (hunger_prefix[step + 1] - hunger_prefix[step]), 0.0)
+    emeralds = emerald_prefix[full] + ratio * (emerald_prefix[step + 1] - emerald_prefix[step]) - food_prices
+
+    # Unaffordable foods can never be chosen
+    emeralds[food_prices >= balance - EPSILON] = -np.inf
+    best = int(np.argmax(emeralds))
+    if not emeralds[best] > EPSILON:
+        return None, 0, []
+
+    best_full = int(full[best])
+    partial_quantity = float(ratio[best] * quantities[order[step[best]]]) if partial[best] else 0
+    ranked_buckets = [buckets[i] for i in order[:best_full + 1]]
+    return foods[best], float(emeralds[best]), expand_plunder(ranked_buckets, best_full, partial_quantity)
+
+
+def select_scenarios(caves: LinearProbeTable, material_names: list[str], price_matrix: list[list[float]],
+                     foods: list[Food], balance: float) -> list[tuple[Food | None, float, list[tuple[Cave, float]]]]:
+    """
+    Evaluate what a player would do under many hypothetical trader price vectors, without touching any live state.
+    Each row of price_matrix is one scenario, giving the best selling price of every material in material_names
+    (materials missing from material_names are not bought, so have a price of 0).
+    Mining rates and cave quantities do not depend on the scenario, so the material buckets and the frontier foods
+    are built once. With NumPy every scenario is ranked and evaluated in one batched pass over (scenario, bucket)
+    arrays, otherwise each scenario gets its own EfficiencyRanking.
+
+    Parameters:
+        caves (LinearProbeTable): Material name -> list of caves holding that material
+        material_names (list[str]): The material of each column of price_matrix
+        price_matrix (list[list[float]]): One row of material prices per scenario
+        foods (list[Food]): The foods on offer
+        balance (float): The emeralds available to buy food
+
+    Returns:
+        For each scenario (in order), the food purchased, the emeralds gained and the caves plundered
+
+    :complexity: O(C + S * (M log M + F log M) + K) where C is the number of caves, S the number of scenarios,
+                 M the number of materials, F the number of foods and K the number of caves plundered
+    """
+    frontier = frontier_foods(foods, balance)
+    columns = LinearProbeTable(len(material_names))
+    for i in range(len(material_names)):
+        columns[material_names[i]] = i
+
+    if np is None:
+        results = []
+        for row in price_matrix:
+            scenario_prices = LinearProbeTable(len(material_names))
+            for mats in caves.keys():
+                scenario_prices[mats] = row[columns[mats]] if mats in columns else 0
+            results.append(EfficiencyRanking(caves, scenario_prices).select(frontier, balance))
+        return results
+
+    zero_prices = LinearProbeTable(len(material_names))
+    for mats in caves.keys():
+        zero_prices[mats] = 0
+    buckets, rates, _, quantities = material_buckets(caves, zero_prices)
+    n_scenarios = len(price_matrix)
+    if not buckets or not frontier or n_scenarios == 0:
+        return [(None, 0, []) for _ in range(n_scenarios)]
+    rates = np.array(rates, dtype=float)
+    quantities = np.array(quantities, dtype=float)
+
+    # Scenario prices of every bucket, (S, B)
+    matrix = np.array(price_matrix, dtype=float).reshape(n_scenarios, len(material_names))
+    prices = np.zeros((n_scenarios, len(buckets)))
+    for b in range(len(buckets)):
+        mats = buckets[b][0].material.name
+        if mats in columns:
+            prices[:, b] = matrix[:, columns[mats]]
+
+    # Rank the buckets of every scenario at once and build the (S, B + 1) prefix sums
+    order = np.argsort(-(prices / rates), axis=1, kind="stable")
+    hunger_prefix = np.zeros((n_scenarios, len(buckets) + 1))
+    emerald_prefix = np.zeros((n_scenarios, len(buckets) + 1))
+    hunger_prefix[:, 1:] = np.cumsum((rates * quantities)[order], axis=1)
+    emerald_prefix[:, 1:] = np.cumsum(np.take_along_axis(prices * quantities, order, axis=1), axis=1)
+
+    # Evaluate each frontier food for every scenario, (S, F)
+    rows = np.arange(n_scenarios)
+    n_buckets = len(buckets)
+    emeralds = np.empty((n_scenarios, len(frontier)))
+    fulls = np.empty((n_scenarios, len(frontier)), dtype=int)
+    ratios = np.empty((n_scenarios, len(frontier)))
+    for f in range(len(frontier)):
+        hunger = frontier[f].hunger_bars
+        # hunger_prefix[s, full] < hunger <= hunger_prefix[s, full + 1], capped at the number of buckets
+        full = np.minimum(np.maximum((hunger_prefix < hunger).sum(axis=1) - 1, 0), n_buckets)
+        remaining = hunger - hunger_prefix[rows, full]
+        step = np.minimum(full, n_buckets - 1)
+        partial = (full < n_buckets) & (remaining > EPSILON)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(partial, remaining / (hunger_prefix[rows, step + 1] - hunger_prefix[rows, step]), 0.0)
+        emeralds[:, f] = (emerald_prefix[rows, full]
+                          + ratio * (emerald_prefix[rows, step + 1] - emerald_prefix[rows, step])
+                          - frontier[f].price)
+        fulls[:, f] = full
+        ratios[:, f] = ratio
+
+    best = np.argmax(emeralds, axis=1)
+    results = []
+    for s in range(n_scenarios):
+        f = int(best[s])
+        if not emeralds[s, f] > EPSILON:
+            results.append((None, 0, []))
+            continue
+        full = int(fulls[s, f])
+        ranked_buckets = [buckets[i] for i in order[s, :full + 1]]
+        partial_quantity = float(ratios[s, f] * quantities[order[s, full]]) if full < n_buckets else 0
+        results.append((frontier[f], float(emeralds[s, f]), expand_plunder(ranked_buckets, full, partial_quantity)))
+    return results
+
+
+if __name__ == "__main__":
+    # Every planner must agree with the baseline heap planner on random games over several days: same food, same
+    # emeralds and the same quantity mined of every material that is being bought (caves of one material are
+    # interchangeable, and materials nobody buys are worth nothing whichever cave they come from)
+    from monte_carlo import generate_game
+    from game import SoloGame
+    from player import Player
+    from plan_cache import PlanCache
+
+    def plan_summary(plan: tuple, prices: LinearProbeTable) -> tuple:
+        food, emeralds, plunder = plan
+        mined = {}
+        for cave, quantity in plunder:
+            if prices[cave.material.name] > 0:
+                mined[cave.material.name] = mined.get(cave.material.name, 0) + quantity
+        return food, round(emeralds, 6), sorted((mats, round(quantity, 6)) for mats, quantity in mined.items()
+                                                if quantity > EPSILON)
+
+    games = 0
+    plans = 0
+    for seed in range(150):
+        try:
+            game = generate_game(SoloGame, seed)
+        except Exception:
+            continue
+        games += 1
+        rng = game.rng
+        # The game's own player is told about every cave and price change, so it runs the incremental planner
+        # behind a plan cache. The others plan from scratch on the same shared world.
+        live = game.player
+        live.set_planner(Player.PLANNER_INCREMENTAL)
+        live.set_plan_cache(8)
+        baseline = Player("Baseline")
+        baseline.set_world(game.world)
+        fresh = []
+        for planner in (Player.PLANNER_PREFIX, Player.PLANNER_VECTOR):
+            player = Player(planner)
+            player.set_world(game.world)
+            player.set_planner(planner)
+            fresh.append(player)
+        # Only told about price changes, so every cave quantity changes behind its back
+        unnotified = Player("Unnotified")
+        unnotified.set_world(game.world)
+        unnotified.set_planner(Player.PLANNER_INCREMENTAL)
+        game.market.listeners.append(unnotified.update_price)
+        fresh.append(unnotified)
+
+        for day in range(5):
+            foods = [Food.random_food(rng) for _ in range(rng.randint(1, 6))]
+            balances = [rng.randint(5, 150) for _ in range(4)]
+            prices = game.max_prices()
+            ranking = EfficiencyRanking(game.world.caves, prices)
+            batch = ranking.select_batch(foods, balances)
+            for i in range(len(balances)):
+                baseline.set_foods(foods)
+                baseline.balance = balances[i]
+                expected = baseline.select_food_and_caves()
+                for player in [live] + fresh:
+                    player.set_foods(foods)
+                    player.balance = balances[i]
+                    assert plan_summary(player.select_food_and_caves(), prices) == plan_summary(expected, prices), \
+                        (seed, day, player.name)
+                # Players report their balance after the day, the rankings only the emeralds gained
+                gained = (expected[0], expected[1] - balances[i], expected[2])
+                assert plan_summary(batch[i], prices) == plan_summary(gained, prices), (seed, day, "batch")
+                plans += 1
+
+            # Scenario i prices every material at a random multiple of today's best price
+            names = [material.name for material in game.materials]
+            matrix = [[prices[name] * rng.randint(0, 4) / 2 for name in names] for _ in range(3)]
+            scenarios = select_scenarios(game.world.caves, names, matrix, foods, balances[0])
+            for row, result in zip(matrix, scenarios):
+                scenario_prices = LinearProbeTable(len(names))
+                for i in range(len(names)):
+                    scenario_prices[names[i]] = row[i]
+                expected = EfficiencyRanking(game.world.caves, scenario_prices).select(foods, balances[0])
+                assert plan_summary(result, scenario_prices) == plan_summary(expected, scenario_prices), \
+                    (seed, day, "scenarios")
+
+            # Apply the baseline plan and move to the next day, changing cave quantities and trader deals
+            baseline.balance = balances[0]
+            plan = baseline.select_food_and_caves()
+            live.balance = balances[0]
+            game.verify_output_and_update_quantities(*plan)
+            game.finish_day()
+            # The patched fingerprints must equal fingerprints rebuilt from scratch
+            rebuilt = PlanCache(1)
+            rebuilt.track_prices(game.max_prices())
+            rebuilt.track_caves(game.world.caves)
+            assert rebuilt.deal_fingerprint == live.plan_cache.deal_fingerprint, (seed, day, "prices")
+            assert rebuilt.cave_fingerprint == live.plan_cache.cave_fingerprint, (seed, day, "caves")
+    print(f"{plans} plans over {games} games: every planner agrees with the heap planner")
@@ -17,6 +17,11 @@ from trader import Trader
 from food import Food
 from trader import RandomTrader
 from heap import MaxHeapTuple
+import planner
+from planner import EfficiencyRanking, EfficiencyIndex, frontier_foods, max_prices, select_vectorized
+from world import World, group_caves, group_deals
+from plan_cache import PlanCache
+from stats import PlannerStats
 from constants import EPSILON
 
 # List taken from https://minecraft.fandom.com/wiki/Mob
@@ -112,14 +117,31 @@ class Player():
         DEFAULT_EMERALDS (int): An integer representing the default amount of emeralds for a player if a paramter is not passed through the init constructor method
         MIN_EMERALDS (int): An integer representing the minimum amount of emeralds a player can have
         MAX_EMERALDS (int): An integer representing the maximum amount of emerals a player can have
+        PLANNER_HEAP (str): Planner that rebuilds a max heap of caves for every food
+        PLANNER_PREFIX (str): Planner that ranks caves once and answers each food with a binary search
+        PLANNER_VECTOR (str): NumPy planner that answers every food in one array pass (falls back to PLANNER_PREFIX without NumPy)
+        PLANNER_INCREMENTAL (str): Planner that keeps an EfficiencyIndex alive across days, patched as prices and caves change
     
     Instance attributes:
         name (str): The string representing 
+        planner (str): The planner used by select_food_and_caves, one of PLANNERS
+        index (EfficiencyIndex | None): The live efficiency index, only kept by the incremental planner
+        world (World | None): The shared world the player's caves and traders tables come from, if any
+        on_market (bool): Whether the player plans with the live best prices of the world's market, set by set_world
+                          and cleared by set_traders
+        plan_cache (PlanCache | None): The LRU memo in front of select_food_and_caves, if enabled
+        stats (PlannerStats): Per-phase counters and timers for select_food_and_caves, disabled by default
     """
     DEFAULT_EMERALDS = 50
     MIN_EMERALDS = 14
     MAX_EMERALDS = 40
 
+    PLANNER_HEAP = "heap"
+    PLANNER_PREFIX = "prefix"
+    PLANNER_VECTOR = "vector"
+    PLANNER_INCREMENTAL = "incremental"
+    PLANNERS = (PLANNER_HEAP, PLANNER_PREFIX, PLANNER_VECTOR, PLANNER_INCREMENTAL)
+
     def __init__(self, name, emeralds=None) -> None:
         self.name = name
         self.balance = self.DEFAULT_EMERALDS if emeralds is None else emeralds
@@ -128,43 +150,125 @@ class Player():
         self.traders = None
         self.material = []
         self.foods = []
-        self.item_sold = 0
         self.hunger = 0
+        self.planner = self.PLANNER_HEAP
+        self.index = None
+        self.world = None
+        self.on_market = False
+        self.plan_cache = None
+        self.stats = PlannerStats()
 
     def set_traders(self, traders_list: list[Trader]) -> None:
-        self.traders = LinearProbeTable(len(traders_list))
-        for i in range(len(traders_list)):
-            if traders_list[i].deal:
-                if (traders_list[i].deal[0].name in self.traders.keys()):
-                    if (traders_list[i].deal[1] not in self.traders[traders_list[i].deal[0].name]):
-                        first_quantity = self.traders[traders_list[i].deal[0].name]  # save first quantity in memory
-                        first_quantity.append(traders_list[i].deal[1])
-                else:
-                    self.traders[traders_list[i].deal[0].name] = [traders_list[i].deal[1]]  # -> price for the deal
+        self.traders = group_deals(traders_list)
+        self.on_market = False
+        self._patch_index_prices()
+        if self.plan_cache is not None:
+            self.plan_cache.track_prices(self.max_prices())
 
     def set_foods(self, foods_list: list[Food]) -> None:
         self.foods = foods_list
 
+    def set_planner(self, name: str) -> None:
+        """
+        Choose the planner used by select_food_and_caves by name
+        :raises ValueError: if name is not one of PLANNERS
+        :complexity: O(1)
+        """
+        if name not in self.PLANNERS:
+            raise ValueError(f"Unknown planner {name}")
+        self.planner = name
+        if name != self.PLANNER_INCREMENTAL:
+            self.index = None
+        elif self.index is None:
+            self.index = EfficiencyIndex()
+            self._patch_index_prices()
+            if self.caves is not None:
+                self.index.set_caves(self.caves)
+
+    def update_cave(self, cave: Cave) -> None:
+        """
+        Tell the player a cave's quantity has changed, so the live efficiency index (if any) can be patched
+        :complexity: O(log M) where M is the number of materials
+        """
+        if self.index is not None:
+            self.index.update_quantity(cave)
+        if self.plan_cache is not None:
+            self.plan_cache.update_cave(cave)
+
+    def update_price(self, material_name: str, price: float) -> None:
+        """
+        Tell the player the best price of a material has changed, so the live efficiency index (if any)
+        and the plan cache (if any) stay up to date.
+        Ignored while the player plans over its own traders (see max_prices).
+        :complexity: O(1)
+        """
+        if not self._uses_market():
+            return
+        if self.index is not None:
+            self.index.update_price(material_name, price)
+        if self.plan_cache is not None:
+            self.plan_cache.update_price(material_name, price)
+
+    def set_plan_cache(self, capacity: int | None) -> None:
+        """
+        Put a bounded LRU PlanCache holding up to capacity plans in front of select_food_and_caves,
+        or remove it with None. Repeated (deals, foods, cave quantities, balance) states then return the cached plan.
+        :complexity: O(T + C), where T = number of traders, C = number of caves
+        """
+        if capacity is None:
+            self.plan_cache = None
+            return
+        self.plan_cache = PlanCache(capacity)
+        if self.traders is not None:
+            self.plan_cache.track_prices(self.max_prices())
+        if self.caves is not None:
+            self.plan_cache.track_caves(self.caves)
+
+    def _patch_index_prices(self) -> None:
+        """
+        Hand the current best selling prices to the live efficiency index (if any)
+        :complexity: O(M + T), where M = number of materials, T = number of traders
+        """
+        if self.index is not None and self.traders is not None:
+            self.index.set_prices(self.max_prices())
+
     @classmethod
-    def random_player(self) -> Player:
-        return Player(PLAYER_NAMES[RandomGen.randint(0, len(PLAYER_NAMES) - 1)])
+    def random_player(self, rng: RandomGen | None = None) -> Player:
+        rng = RandomGen if rng is None else rng
+        return Player(PLAYER_NAMES[rng.randint(0, len(PLAYER_NAMES) - 1)])
 
     def set_materials(self, materials_list: list[Material]) -> None:
         # for i in range(len(materials_list)):
         #    self.hash_table_player[materials_list[i].name] = materials_list[i].mining_rate
         self.material = materials_list
+        self._patch_index_prices()
 
     def set_caves(self, caves_list: list[Cave]) -> None:
-        self.caves = LinearProbeTable(len(caves_list))
+        self.caves = group_caves(caves_list)
         self.caves_length = len(caves_list)
-        for i in range(len(caves_list)):
-            if (caves_list[i].material.name in self.caves.keys()):
-                if (caves_list[i] not in self.caves[caves_list[i].material.name]):
-                    first_quantity = self.caves[caves_list[i].material.name]  # save first quantity in memory
-                    first_quantity.append(
-                        caves_list[i])  # set the value as a value of a container with both quantity values
-            else:
-                self.caves[caves_list[i].material.name] = [caves_list[i]]  # Tuple (cave_material, material_quantity)
+        if self.index is not None:
+            self.index.set_caves(self.caves)
+        if self.plan_cache is not None:
+            self.plan_cache.track_caves(self.caves)
+
+    def set_world(self, world: World) -> None:
+        """
+        Reference the materials, caves and traders tables of a shared World instead of building private copies.
+        Called again by the game whenever the world is rebound.
+        :complexity: O(1), plus patching the live efficiency index if the incremental planner is used
+        """
+        self.world = world
+        self.material = world.materials
+        self.caves = world.caves
+        self.caves_length = world.caves_length
+        self.traders = world.traders
+        self.on_market = world.market is not None
+        if self.index is not None:
+            self._patch_index_prices()
+            self.index.set_caves(self.caves)
+        if self.plan_cache is not None:
+            self.plan_cache.track_prices(self.max_prices())
+            self.plan_cache.track_caves(self.caves)
 
     def select_food_and_caves(self) -> tuple[Food | None, float, list[tuple[Cave, float]]]:
         """
@@ -202,39 +306,115 @@ class Player():
                     Since we are out of hunger bars, we check if the emerald balance is higher than the current maximum/0, whichever is higher.
                     If that is the case, we update the food, and the caves plundered.
 
+        With the prefix planner (see set_planner), caves sharing a material are instead collapsed into one bucket
+        (efficiency is a property of the material), and the buckets are ranked once per day into an EfficiencyRanking
+        with cumulative hunger and emerald arrays. Each food is answered with a binary search plus one fractional step,
+        and only the chosen plan is expanded back into individual caves.
+        This takes O(M + T + C + M log M + F log M) time.
+        The vector planner runs the same computation over NumPy arrays for every food at once, and falls back to the
+        prefix planner when NumPy is not installed.
+        The incremental planner keeps its ranking alive across days in an EfficiencyIndex, which set_traders, set_caves
+        and update_cave patch as prices and quantities change, so planning skips the O(M + T + C) setup. Quantities set
+        directly on a cave without update_cave are still picked up, by an O(C) check of every cave before each plan.
+
+        Every planner first prunes dominated foods (another food costs no more and gives at least as many hunger bars),
+        along with the foods the player cannot afford, so only the Pareto frontier of foods is evaluated. O(F log F).
+
+        If a plan cache is enabled (see set_plan_cache), a call whose deals, foods, cave quantities, balance and planner
+        match a cached plan returns it in O(F) without planning.
+
+        When self.stats is enabled, the time, heap operations and hash table probes of every phase
+        (cache, foods, max_prices, ranking, heap_build, heap_drain, select) are recorded.
+
         :complexity: O(M + T + F * 3C), where M = number of materials, T = number of traders, F = number of foods, and C = number of caves
-        :return: the food purchased, and a list of caves plundered and the amounts mined from the cave
+        :return: the food purchased, the balance after the day, and a list of caves plundered and the amounts mined from the cave
+        """
+        if self.plan_cache is not None:
+            mark = self.stats.start()
+            key = self.plan_cache.key(self.planner, self.foods, self.balance)
+            plan = self.plan_cache.get(key)
+            self.stats.stop("cache", mark)
+            if plan is not None:
+                food_index, max_emeralds, caves_plundered = plan
+                max_food = None if food_index is None else self.foods[food_index]
+                return max_food, self.balance + max_emeralds, list(caves_plundered)
+
+        max_food, max_emeralds, caves_plundered = self._plan()
+        if self.plan_cache is not None:
+            mark = self.stats.start()
+            food_index = None if max_food is None else self.foods.index(max_food)
+            self.plan_cache.put(key, (food_index, max_emeralds, list(caves_plundered)))
+            self.stats.stop("cache", mark)
+        return max_food, self.balance + max_emeralds, caves_plundered
+
+    def _plan(self) -> tuple[Food | None, float, list[tuple[Cave, float]]]:
+        """
+        Run the selected planner over the frontier foods
+        :see: #select_food_and_caves(self)
+        :return: the food purchased, the emeralds gained and the caves plundered
+        """
+        stats = self.stats
+        mark = stats.start()
+        # Only foods on the price / hunger frontier can win, O(F log F)
+        foods = frontier_foods(self.foods, self.balance)
+        mark = stats.stop("foods", mark)
+        if self.planner == self.PLANNER_INCREMENTAL:
+            max_food, max_emeralds, caves_plundered = self.index.select(foods, self.balance)
+        elif self.planner == self.PLANNER_VECTOR and planner.np is not None:
+            prices = self.max_prices()
+            mark = stats.stop("max_prices", mark)
+            max_food, max_emeralds, caves_plundered = select_vectorized(self.caves, prices, foods, self.balance)
+        elif self.planner in (self.PLANNER_PREFIX, self.PLANNER_VECTOR):
+            prices = self.max_prices()
+            mark = stats.stop("max_prices", mark)
+            ranking = EfficiencyRanking(self.caves, prices)
+            mark = stats.stop("ranking", mark)
+            max_food, max_emeralds, caves_plundered = ranking.select(foods, self.balance)
+        else:
+            prices = self.max_prices()
+            mark = stats.stop("max_prices", mark)
+            max_food, max_emeralds, caves_plundered = self._select_with_heap(foods, prices)
+            mark = None
+        stats.stop("select", mark)
+        return max_food, max_emeralds, caves_plundered
+
+    def max_prices(self) -> LinearProbeTable:
+        """
+        Find the maximum selling price of every material over all trader deals.
+        Materials no trader is buying get a price of 0.
+        While the player is attached to the market of its shared world (see set_world), the market's live best price
+        table is returned instead (read-only). Traders given to the player through set_traders are planned over directly.
+        :see: planner.max_prices
+        :complexity: O(1) with a market, otherwise O(M + T), where M = number of materials, T = number of traders
+        """
+        if self._uses_market():
+            return self.world.market.prices
+        return max_prices(self.traders, self.material)
+
+    def _uses_market(self) -> bool:
+        """
+        Returns whether the player is attached to the market of its shared world, from set_world until set_traders.
+        The market is kept live as deals change, the world's traders table is only a snapshot of the deals.
+        :complexity: O(1)
+        """
+        return self.on_market
+
+    def _select_with_heap(self, foods: list[Food], prices: LinearProbeTable) -> tuple[Food | None, float, list[tuple[Cave, float]]]:
+        """
+        Heap planner for select_food_and_caves, rebuilding a max heap of cave efficiencies for every food.
+        :return: the food purchased, the emeralds gained and the caves plundered
+        :complexity: O(F * 3C), where F = number of foods, and C = number of caves
         """
         max_emeralds = 0
         max_food = None
         caves_plundered = []
 
-        max_prices = LinearProbeTable(len(self.traders))
-        # Finding max prices O(T + M)
-        # Iterate through all materials sold by traders, add the maximum price for each material into max_prices.
-        for mats in self.traders.keys():
-            for deal in self.traders[mats]:
-                # In hashtable so add if it is larger
-                try:
-                    if max_prices[mats] < deal - EPSILON:
-                        max_prices[mats] = deal
-                # Not in hashtable so just insert it
-                except KeyError:
-                    max_prices[mats] = deal
-
-        # If not selling material, add into max price as 0
-        for material in self.material:
-            try:
-                if max_prices[material.name]:
-                    pass
-            except KeyError:
-                max_prices[material.name] = 0
-
+        stats = self.stats
         # Iterate through food, and calculate largest emerald gain for each food.
         # O(F * 3C)
-        for food in self.foods:
+        for food in foods:
             if food.price < self.balance - EPSILON:
-                max_emeralds = 0
+                mark = stats.start()
                 cur_emeralds = -food.price
                 self.hunger = food.hunger_bars
                 # Iterate through caves and create a max heap
@@ -244,20 +424,21 @@ class Player():
                 for mats in self.caves.keys():
                     for cave in self.caves[mats]:
                         # For each cave, calculate amount and efficiency
-                        efficiency = max_prices[cave.material.name] / cave.material.mining_rate
+                        efficiency = prices[cave.material.name] / cave.material.mining_rate
                         # Append cave and efficiency as a pair
                         efficiency_array.append((efficiency, cave))
                 # Construct O(C) max heap based on efficiency
                 cave_efficiency.bottom_up(efficiency_array)
+                mark = stats.stop("heap_build", mark)
                 temp_plundered = []
-                # Mine till hungry, keep calling get_max()
+                # Mine till hungry (or every cave is empty), keep calling get_max()
                 # Worst case O(C), best case O(1)
-                while self.hunger > 0 + EPSILON:
+                while self.hunger > 0 + EPSILON and len(cave_efficiency) > 0:
                     # Get cave object
                     cave = cave_efficiency.get_max()[1]
                     # Calculate hunger loss and emerald gain
                     hunger_loss = cave.material.mining_rate * cave.quantity
-                    emerald_gain = cave.quantity * max_prices[cave.material.name]
+                    emerald_gain = cave.quantity * prices[cave.material.name]
                     # Assume cave is mined completely
                     quantity_mined = cave.quantity
                     # Enough hunger points, just subtract from self.hunger
@@ -275,13 +456,13 @@ class Player():
                         quantity_mined = quantity_mined * ratio
                     # Append cave object and quantity mined to plundered
                     temp_plundered.append((cave,quantity_mined))
+                stats.stop("heap_drain", mark)
                 if cur_emeralds > max_emeralds + EPSILON:
                     # If this results in new max emerald gain, update return values
                     caves_plundered = temp_plundered
                     max_emeralds = cur_emeralds
                     max_food = food
-        self.item_sold += self.balance + max_emeralds
-        return max_food, self.item_sold, caves_plundered
+        return max_food, max_emeralds, caves_plundered
 
     def __str__(self) -> str:
         return f'{self.name} has {self.balance} emeralds'  # Subject to change
@@ -358,6 +539,8 @@ if __name__ == "__main__":
     p.set_foods(foods)
     print(p.caves_length)
     print(p.select_food_and_caves())
+    p.set_planner(Player.PLANNER_PREFIX)
+    print(p.select_food_and_caves())
 
     # Food = Cooked Chicken Cuts
     # Balance = 209.
@@ -4,12 +4,36 @@ Random number generator class. Uses LCG method with some reasonable initialisati
 __author__ = "Jackson Goerner"
 
 import time
+from types import MethodType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class stream_method:
+    """
+    Like classmethod, but called on a RandomGen object it binds to that object instead of the class.
+    So `RandomGen.random()` draws from the default (class level) stream and `rng.random()` from the stream of rng.
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.__doc__ = function.__doc__
+
+    def __get__(self, instance, owner):
+        return MethodType(self.function, owner if instance is None else instance)
+
 
 class RandomGen():
     """
     Class used to generate (seeded) random numbers for interesting outcomes and repeatable tests.
     
     Uses LCG method. All methods are O(1) best/worst case time complexity unless stated otherwise.
+    The class itself is the default stream. Every RandomGen object is an independent stream with its own seed,
+    so games holding their own stream can run side by side (in threads or in one process) without
+    disturbing each other's sequences.
     
     Usage:
     ```
@@ -17,6 +41,11 @@ class RandomGen():
     RandomGen.random()           # Random number from 0 to 2^32-1
     RandomGen.randint(1, 10)     # Random number from 1 to 10
     RandomGen.random_chance(0.33) # True 33% of the time, False 67% of the time.
+
+    rng = RandomGen(123)         # Independent stream, same sequence as the default stream seeded with 123
+    rng.randint(1, 10)
+    rng.jump(1000)               # Skip the next 1000 draws in O(log n)
+    workers = rng.split(4, 250)  # 4 streams, each starting 250 draws after the previous one
     ```
     """
     
@@ -25,47 +54,231 @@ class RandomGen():
     C = 11
     
     seed = time.time_ns()
+
+    def __init__(self, seed=None):
+        """Creates an independent stream, seeded with `seed` (or the current time)."""
+        self.set_seed(seed)
     
-    @classmethod
-    def set_seed(cls, seed=None):
+    @stream_method
+    def set_seed(self, seed=None):
         """Seed all future calls to `random`."""
         seed = time.time_ns() if seed is None else seed
-        cls.seed = seed
+        self.seed = seed
     
-    @classmethod
-    def random(cls):
+    @stream_method
+    def random(self):
         """Returns a random integer from 0 to 2^32-1"""
-        cls.seed = (cls.A * cls.seed + cls.C) % cls.MOD
-        return cls.seed >> 16
+        self.seed = (self.A * self.seed + self.C) % self.MOD
+        return self.seed >> 16
 
     @classmethod
-    def random_float(cls):
+    def jump_constants(cls, n):
+        """
+        Returns (multiplier, increment) such that n steps of the LCG take seed to (multiplier * seed + increment) % MOD.
+        Composes the affine step with itself by repeated squaring.
+        :complexity: O(log n)
+        """
+        n %= cls.MOD  # The period is MOD (C is odd and A - 1 is a multiple of 4), so jumping back wraps around
+        multiplier, increment = 1, 0
+        step_multiplier, step_increment = cls.A, cls.C
+        while n > 0:
+            if n & 1:
+                multiplier = (step_multiplier * multiplier) % cls.MOD
+                increment = (step_multiplier * increment + step_increment) % cls.MOD
+            step_increment = (step_multiplier * step_increment + step_increment) % cls.MOD
+            step_multiplier = (step_multiplier * step_multiplier) % cls.MOD
+            n >>= 1
+        return multiplier, increment
+
+    @stream_method
+    def jump(self, n):
+        """
+        Skip the next `n` calls to `random` (negative `n` goes back), as if they had been made.
+        :complexity: O(log n)
+        """
+        multiplier, increment = self.jump_constants(n)
+        self.seed = (multiplier * self.seed + increment) % self.MOD
+
+    @stream_method
+    def split(self, k, spacing=None):
+        """
+        Returns `k` new streams starting `spacing` draws apart from the current position of this stream,
+        which is not advanced. With the default spacing the period is cut in `k` equal non-overlapping parts.
+        Stream i gives draws i * spacing onwards of this stream, so workers each taking `spacing` draws
+        from their stream together produce exactly the draws of this stream.
+        :complexity: O(k + log spacing)
+        """
+        spacing = self.MOD // k if spacing is None else spacing
+        multiplier, increment = self.jump_constants(spacing)
+        streams = []
+        seed = self.seed
+        for _ in range(k):
+            streams.append(RandomGen(seed))
+            seed = (multiplier * seed + increment) % self.MOD
+        return streams
+
+    @stream_method
+    def random_at(self, i):
+        """
+        Returns what the `i`-th next call to `random` will return (0 for the next one), without advancing the stream.
+        :complexity: O(log i)
+        """
+        multiplier, increment = self.jump_constants(i + 1)
+        return ((multiplier * self.seed + increment) % self.MOD) >> 16
+
+    @stream_method
+    def random_array(self, n):
+        """
+        Returns the next `n` results of `random` in one call, bit-identical to `n` sequential calls,
+        as a NumPy uint64 array (a list without NumPy).
+        With NumPy the LCG states are filled by doubling: the second half of each block is the first half jumped
+        ahead by the block size, so only O(log n) array operations are needed.
+        :complexity: O(n)
+        """
+        if np is None:
+            return [self.random() for _ in range(n)]
+        states = np.empty(n, dtype=np.uint64)
+        if n == 0:
+            return states
+        # MOD divides 2^64, so uint64 arithmetic (which wraps) followed by a mask is arithmetic modulo MOD
+        mask = np.uint64(self.MOD - 1)
+        states[0] = (self.A * self.seed + self.C) % self.MOD
+        filled = 1
+        while filled < n:
+            block = min(filled, n - filled)
+            multiplier, increment = self.jump_constants(filled)
+            states[filled:filled + block] = (states[:block] * np.uint64(multiplier) + np.uint64(increment)) & mask
+            filled += block
+        self.seed = int(states[-1])
+        return states >> np.uint64(16)
+
+    @stream_method
+    def random_float_array(self, n):
+        """
+        Returns the next `n` results of `random_float` in one call, bit-identical to `n` sequential calls,
+        as a NumPy float64 array (a list without NumPy).
+        :complexity: O(n)
+        """
+        draws = self.random_array(n)
+        if np is None:
+            return [draw / (1 << 32) for draw in draws]
+        return draws.astype(np.float64) / (1 << 32)
+
+    @stream_method
+    def randint_array(self, lo, hi, n):
+        """
+        Returns the next `n` results of `randint(lo, hi)` in one call, bit-identical to `n` sequential calls,
+        as a NumPy int64 array (a list without NumPy).
+        :complexity: O(n)
+        """
+        draws = self.random_array(n)
+        if np is None:
+            return [(draw % (hi - lo + 1)) + lo for draw in draws]
+        return (draws % np.uint64(hi - lo + 1)).astype(np.int64) + lo
+
+    @stream_method
+    def random_chance_array(self, ratio, n):
+        """
+        Returns the next `n` results of `random_chance(ratio)` in one call, bit-identical to `n` sequential calls,
+        as a NumPy bool array (a list without NumPy).
+        :complexity: O(n)
+        """
+        floats = self.random_float_array(n)
+        if np is None:
+            return [value < ratio for value in floats]
+        return floats < ratio
+
+    @stream_method
+    def random_float(self):
         """Returns a random floating point integer in the range 0 to 1."""
-        return cls.random() / (1 << 32)
+        return self.random() / (1 << 32)
 
-    @classmethod
-    def randint(cls, lo, hi):
+    @stream_method
+    def randint(self, lo, hi):
         """Returns a random integer from `lo` to `hi` inclusive on both ends."""
-        return (cls.random() % (hi - lo + 1)) + lo
+        return (self.random() % (hi - lo + 1)) + lo
 
-    @classmethod
-    def random_chance(cls, ratio):
+    @stream_method
+    def random_chance(self, ratio):
         """Returns random()/2^32 < ratio"""
-        return cls.random_float() < ratio
+        return self.random_float() < ratio
 
-    @classmethod
-    def random_choice(cls, collection) -> None:
+    @stream_method
+    def random_choice(self, collection) -> None:
         """Returns a random choice from a collection that supports __getitem__ and __len__"""
-        return collection[cls.randint(0, len(collection)-1)]
+        return collection[self.randint(0, len(collection)-1)]
 
-    @classmethod
-    def random_shuffle(cls, collection) -> None:
+    @stream_method
+    def random_shuffle(self, collection, k=None) -> None:
         """
-        Randomly shuffles a collection that supports __getitem__, __setitem__ and __len__
-        :complexity: O(len(collection))
+        Randomly shuffles (in place, Fisher-Yates) a collection that supports __getitem__, __setitem__ and __len__,
+        such as a list or an ArrayR.
+        If `k` is given only the first `k` positions are drawn: they hold a uniform random sample of `k` elements
+        in random order, and the rest of the collection holds the other elements in no particular order.
+        :complexity: O(k), O(len(collection)) for a full shuffle
         """
-        positions = [(RandomGen.random(), i) for i in range(len(collection))]
-        positions.sort() # I can use inbuilt list sorting here - YOU CANNOT ANYWHERE ELSE! >:D
-        tmp = [collection[p[1]] for p in positions]
-        for x in range(len(collection)):
-            collection[x] = tmp[x]
+        n = len(collection)
+        k = n if k is None else min(k, n)
+        # The last position of a full shuffle has nothing left to swap with, so it takes no draw
+        count = max(0, min(k, n - 1))
+        # Position i swaps with randint(i, n - 1), all the draws are made in bulk
+        draws = self.random_array(count)
+        if np is None:
+            targets = [draws[i] % (n - i) + i for i in range(count)]
+        else:
+            positions = np.arange(count, dtype=np.uint64)
+            targets = (draws % (np.uint64(n) - positions) + positions).tolist()
+        for i in range(count):
+            j = targets[i]
+            if j != i:
+                collection[i], collection[j] = collection[j], collection[i]
+
+
+if __name__ == "__main__":
+    # Jumps, splits, bulk draws and shuffles must match sequential calls to random
+    for seed in (0, 1, 123, RandomGen.MOD - 1):
+        reference = RandomGen(seed)
+        draws = [reference.random() for _ in range(600)]
+
+        RandomGen.set_seed(seed)
+        assert [RandomGen.random() for _ in range(5)] == draws[:5]
+        rng = RandomGen(seed)
+        for n in (0, 1, 2, 7, 64, 599):
+            assert RandomGen(seed).random_at(n) == draws[n]
+            rng.set_seed(seed)
+            rng.jump(n)
+            assert rng.random() == draws[n]
+        rng.set_seed(seed)
+        rng.jump(300)
+        rng.jump(-300)
+        assert rng.seed == seed
+
+        streams = RandomGen(seed).split(4, 150)
+        assert [stream.random() for stream in streams for _ in range(150)] == draws
+
+        rng = RandomGen(seed)
+        bulk = []
+        for n in (0, 1, 2, 3, 100, 94):
+            bulk.extend(int(draw) for draw in rng.random_array(n))
+        assert bulk == draws[:200]
+        reference = RandomGen(seed)
+        rng = RandomGen(seed)
+        assert list(rng.random_float_array(50)) == [reference.random_float() for _ in range(50)]
+        assert list(rng.randint_array(-3, 9, 50)) == [reference.randint(-3, 9) for _ in range(50)]
+        assert list(rng.random_chance_array(0.3, 50)) == [reference.random_chance(0.3) for _ in range(50)]
+        assert rng.seed == reference.seed
+
+        for n in (0, 1, 2, 10, 57):
+            for k in (None, 0, 1, 5, n):
+                # Fisher-Yates with one sequential draw per position
+                expected = list(range(n))
+                reference = RandomGen(seed)
+                count = n - 1 if k is None else min(k, n - 1)
+                for i in range(max(0, count)):
+                    j = reference.randint(i, n - 1)
+                    expected[i], expected[j] = expected[j], expected[i]
+                shuffled = list(range(n))
+                rng = RandomGen(seed)
+                rng.random_shuffle(shuffled, k)
+                assert shuffled == expected and rng.seed == reference.seed, (n, k)
+    print("Jumps, splits, bulk draws and shuffles match sequential draws")
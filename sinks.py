@@ -0,0 +1,118 @@
+from __future__ import annotations
+"""
+
+This file implements the sinks Game.run hands its day records to: in memory, to a file, or to a callback
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+import json
+from abc import abstractmethod, ABC
+from typing import Callable
+
+
+class Sink(ABC):
+    """
+
+    Receives one structured record per simulated day from Game.run.
+    A record is a dict of plain values:
+        {"day": int, "foods": [food name, ...],
+         "players": [{"name": str, "food": food name | None, "balance": float,
+                      "caves": [[cave name, quantity mined], ...]}, ...]}
+    """
+
+    @abstractmethod
+    def write(self, record: dict) -> None:
+        """
+        Receive the record of one day
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Called by Game.run once the last day has been written
+        :complexity: O(1)
+        """
+        pass
+
+
+class MemorySink(Sink):
+    """
+
+    Keeps every record in memory.
+
+    Instance Attributes:
+        records (list[dict]): The records written so far, in order
+    """
+
+    def __init__(self) -> None:
+        """
+        Creates an empty sink
+        :complexity: O(1)
+        """
+        self.records = []
+
+    def write(self, record: dict) -> None:
+        """
+        Keep the record of one day
+        :complexity: O(1)
+        """
+        self.records.append(record)
+
+
+class FileSink(Sink):
+    """
+
+    Writes every record to a file as one line of JSON.
+
+    Instance Attributes:
+        file: The open file the records are written to
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens (and truncates) the file at path
+        :complexity: O(1)
+        """
+        self.file = open(path, "w")
+
+    def write(self, record: dict) -> None:
+        """
+        Write the record of one day as a line of JSON
+        :complexity: O(R) where R is the size of the record
+        """
+        self.file.write(json.dumps(record))
+        self.file.write("\n")
+
+    def close(self) -> None:
+        """
+        Close the file
+        :complexity: O(1)
+        """
+        self.file.close()
+
+
+class CallbackSink(Sink):
+    """
+
+    Hands every record to a function.
+
+    Instance Attributes:
+        callback (Callable[[dict], None]): The function called with the record of each day
+    """
+
+    def __init__(self, callback: Callable[[dict], None]) -> None:
+        """
+        Creates a sink calling callback with each record
+        :complexity: O(1)
+        """
+        self.callback = callback
+
+    def write(self, record: dict) -> None:
+        """
+        Call the callback with the record of one day
+        :complexity: O(1), plus the work done by the callback
+        """
+        self.callback(record)
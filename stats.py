@@ -0,0 +1,198 @@
+from __future__ import annotations
+"""
+
+This file implements the PlannerStats class, toggleable per-phase instrumentation for the planners
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+from time import perf_counter_ns
+from hash_table import LinearProbeTable
+from heap import MaxHeap
+
+
+class PlannerStats:
+    """
+
+    Per-phase counters and timers for a planner. Every phase records how many times it ran, the nanoseconds spent in
+    it, the heap operations (MaxHeap add/get_max/bottom_up) and the hash table slots probed (LinearProbeTable) while it
+    ran. Heaps and hash tables only count their operations while at least one PlannerStats is enabled, so with every
+    stats disabled they cost one check per heap operation or probe loop, and the stats one check per phase boundary.
+    The counters are shared by the whole process, so a phase also counts the work other threads do while it runs.
+
+    Usage:
+    ```
+    mark = stats.start()
+    ...  # first phase
+    mark = stats.stop("first phase", mark)
+    ...  # second phase
+    mark = stats.stop("second phase", mark)
+    ```
+
+    Instance Attributes:
+        enabled (bool): Whether phases are being recorded
+        phases (dict[str, list[int]]): Phase name -> [runs, nanoseconds, heap operations, slots probed]
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Creates empty stats, disabled unless enabled is True
+        :complexity: O(1)
+        """
+        self.enabled = False
+        self.phases = {}
+        if enabled:
+            self.enable()
+
+    def enable(self) -> None:
+        """
+        Start recording phases, turning on the heap and hash table counters
+        :complexity: O(1)
+        """
+        if not self.enabled:
+            MaxHeap.counting += 1
+            LinearProbeTable.counting += 1
+        self.enabled = True
+
+    def disable(self) -> None:
+        """
+        Stop recording phases, keeping what was recorded.
+        The heap and hash table counters are turned off once no PlannerStats is enabled, or enabled ones are dropped.
+        :complexity: O(1)
+        """
+        if self.enabled:
+            MaxHeap.counting -= 1
+            LinearProbeTable.counting -= 1
+        self.enabled = False
+
+    def __del__(self) -> None:
+        """
+        Turn the heap and hash table counters back off if the stats are dropped while still enabled
+        :complexity: O(1)
+        """
+        self.disable()
+
+    def reset(self) -> None:
+        """
+        Forget every recorded phase
+        :complexity: O(1)
+        """
+        self.phases = {}
+
+    def start(self) -> tuple[int, int, int] | None:
+        """
+        Returns a mark for the start of a phase, or None if the stats are disabled
+        :complexity: O(1)
+        """
+        if not self.enabled:
+            return None
+        return (perf_counter_ns(), MaxHeap.operations, LinearProbeTable.slots_probed)
+
+    def stop(self, phase: str, mark: tuple[int, int, int] | None) -> tuple[int, int, int] | None:
+        """
+        Record the phase that began at mark, and return a mark for the start of the next phase
+        :complexity: O(1)
+        """
+        if mark is None:
+            return None
+        now = (perf_counter_ns(), MaxHeap.operations, LinearProbeTable.slots_probed)
+        if phase not in self.phases:
+            self.phases[phase] = [0, 0, 0, 0]
+        record = self.phases[phase]
+        record[0] += 1
+        record[1] += now[0] - mark[0]
+        record[2] += now[1] - mark[1]
+        record[3] += now[2] - mark[2]
+        return now
+
+    def phase(self, phase: str) -> tuple[int, int, int, int]:
+        """
+        Returns a tuple of 4 values for a phase (all 0 if it never ran):
+        1. Number of times the phase ran
+        2. Total nanoseconds spent in the phase
+        3. Total heap operations done in the phase
+        4. Total hash table slots probed in the phase
+        """
+        if phase not in self.phases:
+            return (0, 0, 0, 0)
+        return tuple(self.phases[phase])
+
+    def __str__(self) -> str:
+        """
+        Returns one line per recorded phase
+        :complexity: O(P) where P is the number of phases
+        """
+        result = ""
+        for phase, (runs, ns, heap_operations, slots_probed) in self.phases.items():
+            result += f"{phase}: {runs} runs, {ns} ns, {heap_operations} heap operations, {slots_probed} slots probed\n"
+        return result
+
+
+if __name__ == "__main__":
+    # Counters must only move while stats are enabled, and the phases must account for all the work recorded
+    from game import SoloGame, MultiplayerGame
+    from food import Food
+    from random_gen import RandomGen
+    from player import Player
+
+    for planner in Player.PLANNERS:
+        game = SoloGame(RandomGen(2022))
+        game.verbose = False
+        game.initialise_game()
+        player = game.player
+        player.set_planner(planner)
+        operations, slots_probed = MaxHeap.operations, LinearProbeTable.slots_probed
+        game.run(5)
+        assert player.stats.phases == {}
+        assert (MaxHeap.operations, LinearProbeTable.slots_probed) == (operations, slots_probed), planner
+
+        player.stats.enable()
+        for _ in range(5):
+            game.simulate_day()
+            before = [sum(record[i] for record in player.stats.phases.values()) for i in (1, 2, 3)]
+            operations, slots_probed = MaxHeap.operations, LinearProbeTable.slots_probed
+            start = perf_counter_ns()
+            player.select_food_and_caves()
+            elapsed = perf_counter_ns() - start
+            after = [sum(record[i] for record in player.stats.phases.values()) for i in (1, 2, 3)]
+            assert after[0] - before[0] <= elapsed, planner
+            assert after[1] - before[1] == MaxHeap.operations - operations, planner
+            assert after[2] - before[2] == LinearProbeTable.slots_probed - slots_probed, planner
+            game.finish_day()
+        assert player.stats.phase("select")[0] == 10 or planner == Player.PLANNER_HEAP, planner
+        if planner == Player.PLANNER_HEAP:
+            assert player.stats.phase("heap_build")[2] > 0 and player.stats.phase("heap_drain")[3] > 0
+
+        # Dropping enabled stats must turn the counters off for everyone else
+        player.stats = PlannerStats()
+        assert MaxHeap.counting == 0 and LinearProbeTable.counting == 0, planner
+        operations, slots_probed = MaxHeap.operations, LinearProbeTable.slots_probed
+        game.run(2)
+        assert (MaxHeap.operations, LinearProbeTable.slots_probed) == (operations, slots_probed), planner
+
+    game = MultiplayerGame(RandomGen(2022))
+    game.verbose = False
+    game.initialise_game()
+    for enabled in (False, True, False):
+        if enabled:
+            game.stats.enable()
+        else:
+            game.stats.disable()
+        for _ in range(5):
+            food = Food.random_food(game.rng)
+            before = [sum(record[i] for record in game.stats.phases.values()) for i in (1, 2, 3)]
+            operations, slots_probed = MaxHeap.operations, LinearProbeTable.slots_probed
+            start = perf_counter_ns()
+            game.verify_output_and_update_quantities(*game.select_for_players(food))
+            elapsed = perf_counter_ns() - start
+            after = [sum(record[i] for record in game.stats.phases.values()) for i in (1, 2, 3)]
+            assert after[0] - before[0] <= elapsed
+            if enabled:
+                assert after[1] - before[1] == MaxHeap.operations - operations > 0
+            else:
+                assert after == before and (MaxHeap.operations, LinearProbeTable.slots_probed) == (operations, slots_probed)
+            game.finish_day()
+    assert game.stats.phase("players")[0] == 5
+    print("Heap operations and probes are only counted while stats are enabled")
@@ -86,7 +86,28 @@ class Trader(ABC):
         self.name = name
         self.materials = None
         self.trader_type = None
-        self.deal = None
+        self.rng = RandomGen
+        self.market = None
+        self._deal = None
+
+    @property
+    def deal(self) -> tuple[Material, float] | None:
+        """
+        The Trader's current deal, or None
+        :complexity: O(1)
+        """
+        return self._deal
+
+    @deal.setter
+    def deal(self, deal: tuple[Material, float] | None) -> None:
+        """
+        Sets the Trader's deal, reporting the change to the market the Trader is attached to (if any)
+        :complexity: O(1), plus O(log T) to patch the market where T is the number of traders
+        """
+        old_deal = self._deal
+        self._deal = deal
+        if self.market is not None:
+            self.market.deal_changed(self, old_deal, deal)
 
     def get_trader_type(self):
         """
@@ -97,7 +118,7 @@ class Trader(ABC):
         return self.trader_type
 
     @classmethod
-    def random_trader(cls):
+    def random_trader(cls, rng: RandomGen | None = None):
         pass
 
     @abstractmethod
@@ -163,14 +184,17 @@ class RandomTrader(Trader):
         self.materials = []
 
     @classmethod
-    def random_trader(cls):
+    def random_trader(cls, rng: RandomGen | None = None):
         """
         Generate a random trader in RandomTrader class.
         :complexity: O(1)
+        :rng: the random stream to draw from (and to generate the trader's deals), defaults to the RandomGen class stream
         """
         # Generate random trader based on RandomTrader
-        name_of_trade = TRADER_NAMES[RandomGen.randint(0, len(TRADER_NAMES) - 1)]
+        rng = RandomGen if rng is None else rng
+        name_of_trade = TRADER_NAMES[rng.randint(0, len(TRADER_NAMES) - 1)]
         trader_to_return = RandomTrader(name_of_trade)
+        trader_to_return.rng = rng
         return trader_to_return
 
     def set_all_materials(self, mats: list[Material]) -> None:
@@ -192,8 +216,8 @@ class RandomTrader(Trader):
         Generates a deal for the RandomTrader
         :complexity: O(1)
         """
-        material_for_deal = self.materials[RandomGen.randint(0, len(self.materials) - 1)]
-        buy_price = round(2 + 8 * RandomGen.random_float(), 2)
+        material_for_deal = self.materials[self.rng.randint(0, len(self.materials) - 1)]
+        buy_price = round(2 + 8 * self.rng.random_float(), 2)
         self.deal = (material_for_deal, buy_price)
 
 
@@ -219,12 +243,15 @@ class RangeTrader(Trader):
         self.materials = AVLTree()
 
     @classmethod
-    def random_trader(cls):
+    def random_trader(cls, rng: RandomGen | None = None):
         """
         Generate a random trader in RangeTrader class.
+        :rng: the random stream to draw from (and to generate the trader's deals), defaults to the RandomGen class stream
         """
-        name_of_trade = TRADER_NAMES[RandomGen.randint(0, len(TRADER_NAMES) - 1)]
+        rng = RandomGen if rng is None else rng
+        name_of_trade = TRADER_NAMES[rng.randint(0, len(TRADER_NAMES) - 1)]
         trader_to_return = RangeTrader(name_of_trade)
+        trader_to_return.rng = rng
         return trader_to_return
 
     def set_all_materials(self, mats: list[Material]) -> None:
@@ -254,13 +281,13 @@ class RangeTrader(Trader):
         :complexity: O(j-i+log n) where n is the number of nodes in the AVLTree, j and i are the random integers.
         """
         # Generate random i,j integers
-        i = RandomGen.randint(0, len(self.materials) - 1)
-        j = RandomGen.randint(i, len(self.materials) - 1)
+        i = self.rng.randint(0, len(self.materials) - 1)
+        j = self.rng.randint(i, len(self.materials) - 1)
 
         # Generate materials in i,jth easiest range
         material_list = self.materials_between(i, j)
-        material_for_deal = material_list[RandomGen.randint(0, len(material_list)-1)]
-        buy_price = round(2 + 8 * RandomGen.random_float(), 2)
+        material_for_deal = material_list[self.rng.randint(0, len(material_list)-1)]
+        buy_price = round(2 + 8 * self.rng.random_float(), 2)
         self.deal = (material_for_deal, buy_price)
 
     def materials_between(self, i: int, j: int) -> list[Material]:
@@ -286,12 +313,15 @@ class HardTrader(Trader):
         self.materials = MaxHeapMats(1000)
 
     @classmethod
-    def random_trader(cls):
+    def random_trader(cls, rng: RandomGen | None = None):
         """
         Generates a random trader in HardTrader class.
+        :rng: the random stream to draw from (and to generate the trader's deals), defaults to the RandomGen class stream
         """
-        name_of_trade = TRADER_NAMES[RandomGen.randint(0, len(TRADER_NAMES) - 1)]
+        rng = RandomGen if rng is None else rng
+        name_of_trade = TRADER_NAMES[rng.randint(0, len(TRADER_NAMES) - 1)]
         trader_to_return = HardTrader(name_of_trade)
+        trader_to_return.rng = rng
         return trader_to_return
 
     def add_material(self, mat: Material) -> None:
@@ -330,7 +360,7 @@ class HardTrader(Trader):
         :complexity: O(1)
         """
         material_for_deal = self.materials.get_max() # material at the top of the heap
-        buy_price = round(2 + 8 * RandomGen.random_float(), 2) #deal price calculation
+        buy_price = round(2 + 8 * self.rng.random_float(), 2) #deal price calculation
         self.deal = (material_for_deal, buy_price)
 
 
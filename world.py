@@ -0,0 +1,121 @@
+from __future__ import annotations
+"""
+
+This file implements the World class, a shared read-only view of a game world referenced by every Player
+
+October 2022
+"""
+
+__author__ = "Code by Daniel Liu, Ben Abraham, Johnny Ta, Bangze Han"
+
+from hash_table import LinearProbeTable
+from material import Material
+from cave import Cave
+from trader import Trader
+from market import Market
+
+
+def group_caves(caves_list: list[Cave]) -> LinearProbeTable:
+    """
+    Group caves by the name of the material they hold. A cave listed twice is only kept once.
+
+    Parameters:
+        caves_list (list[Cave]): The caves to group
+
+    Returns:
+        A LinearProbeTable of material name -> list of caves holding that material
+
+    :complexity: O(C) where C is the number of caves
+    """
+    caves = LinearProbeTable(len(caves_list))
+    grouped = set()
+    for cave in caves_list:
+        if cave in grouped:
+            continue
+        grouped.add(cave)
+        if cave.material.name in caves:
+            caves[cave.material.name].append(cave)
+        else:
+            caves[cave.material.name] = [cave]
+    return caves
+
+
+def group_deals(traders_list: list[Trader]) -> LinearProbeTable:
+    """
+    Group the current trader deals by the name of the material being bought. Equal prices are only kept once.
+
+    Parameters:
+        traders_list (list[Trader]): The traders whose deals are grouped, traders without a deal are skipped
+
+    Returns:
+        A LinearProbeTable of material name -> list of distinct deal prices for that material
+
+    :complexity: O(T) where T is the number of traders
+    """
+    traders = LinearProbeTable(len(traders_list))
+    grouped = set()
+    for trader in traders_list:
+        if trader.deal:
+            material_name, price = trader.deal[0].name, trader.deal[1]
+            if (material_name, price) in grouped:
+                continue
+            grouped.add((material_name, price))
+            if material_name in traders:
+                traders[material_name].append(price)
+            else:
+                traders[material_name] = [price]
+    return traders
+
+
+class World:
+    """
+
+    This class is a shared, read-only view of a game world. It is built once by the Game and referenced by every
+    Player, so the grouped caves and trader deals exist once per game instead of once per player.
+    Players must not modify the tables, the Game rebinds the world when it changes.
+
+    Instance Attributes:
+        materials (list[Material]): The materials of the world
+        caves (LinearProbeTable): Material name -> list of caves holding that material
+        caves_length (int): The number of caves in the world
+        traders (LinearProbeTable): Material name -> list of distinct deal prices for that material, as of the last
+                                    rebind. Deals changed since then are only seen through the market.
+        market (Market | None): The live best price index of the game, if any. Players plan over its prices.
+        version (int): The number of times the world has been rebound
+    """
+
+    def __init__(self, materials: list[Material], caves: list[Cave], traders: list[Trader],
+                 market: Market | None = None) -> None:
+        """
+        Build the shared tables for a world.
+
+        Parameters:
+            materials (list[Material]): The materials of the world
+            caves (list[Cave]): The caves of the world
+            traders (list[Trader]): The traders of the world
+            market (Market | None): The live best price index of the game, kept up to date by the game itself
+
+        :complexity: O(M + C + T) where M, C and T are the number of materials, caves and traders
+        """
+        self.materials = materials
+        self.caves = group_caves(caves)
+        self.caves_length = len(caves)
+        self.traders = group_deals(traders)
+        self.market = market
+        self.version = 0
+
+    def rebind(self, materials: list[Material] | None = None, caves: list[Cave] | None = None,
+               traders: list[Trader] | None = None) -> None:
+        """
+        Rebuild only the parts of the world that changed (those passed in), keeping the rest.
+
+        :complexity: O(C) if caves are passed plus O(T) if traders are passed, otherwise O(1)
+        """
+        if materials is not None:
+            self.materials = materials
+        if caves is not None:
+            self.caves = group_caves(caves)
+            self.caves_length = len(caves)
+        if traders is not None:
+            self.traders = group_deals(traders)
+        self.version += 1